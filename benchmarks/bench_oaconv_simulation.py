@@ -0,0 +1,54 @@
+# Benchmark de la simulación por convolución (overlap-add) contra SOS y lsim según el orden y el largo de la señal
+# Uso: python -m benchmarks.bench_oaconv_simulation [max_exp]   (por defecto 10^3 a 10^7)
+# Con órdenes habituales SOS es más rápido y simulateOAConv lo usa directamente; la convolución gana con
+# muchos biquads y respuesta corta (Butterworth N=40 y 48 con corte a fs/20; el criterio de oaconv_pays
+# es conservador y deja N=40, donde la ventaja es chica, en SOS). El error de OACONV se mide
+# contra SOS, que es lo que aproxima; la diferencia con lsim es la de discretizar por biquads y no la del
+# truncamiento, y se muestra también la de SOS contra lsim para compararlas
+import sys
+import time
+import warnings
+import numpy as np
+from scipy import signal
+
+from src.package.transfer_function import TFunction, LSIM, SOS, OACONV, oaconv_filter, oaconv_pays
+
+LSIM_MAX = 10**5 # el loop de lsim es demasiado lento por encima de esto
+FS = 4e6
+CASES = [(4, 1e4), (8, 1e4), (40, 2e5), (48, 2e5)] # (orden Butterworth, corte en Hz)
+
+def timed(f, *args):
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        y = f(*args)
+    return y, time.perf_counter() - start
+
+def butter(N, fc):
+    z, p, k = signal.butter(N, 1, analog=True, output='zpk')
+    p = p*2*np.pi*fc # escalado a mano: signal.butter desborda calculando k con órdenes altos
+    return TFunction(z, p, np.real(np.prod(-p)))
+
+def run(tf, model, sections, n):
+    t = np.arange(n) / FS
+    x = np.cos(2*np.pi*1000*t) + 0.5*np.cos(2*np.pi*15000*t)
+    (oa, bound), oa_time = timed(oaconv_filter, model, x)
+    sos, sos_time = timed(tf.simulateInputSignal, x, t, SOS)
+    line = f'  n=10^{int(np.log10(n))}  oaconv: {oa_time:.3f} s  sos: {sos_time:.3f} s  x{sos_time/oa_time:.2f}'
+    line += f'  usa oaconv: {"sí" if oaconv_pays(sections, len(model[0]), n) else "no"}'
+    line += f'  error vs sos: {np.max(np.abs(oa - sos)):.2e}  cota: {bound:.2e}'
+    if n <= LSIM_MAX:
+        lsim, lsim_time = timed(tf.simulateInputSignal, x, t, LSIM)
+        if np.all(np.isfinite(lsim)): # con órdenes altos la forma de estados de lsim no es confiable
+            line += f'  vs lsim: oaconv {np.max(np.abs(oa - lsim)):.2e}, sos {np.max(np.abs(sos - lsim)):.2e}'
+    print(line)
+
+if __name__ == "__main__":
+    max_exp = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    for N, fc in CASES:
+        tf = butter(N, fc)
+        model = tf.getDiscreteModel(OACONV, 1 / FS) # la respuesta truncada se calcula una vez por paso
+        sections = len(tf.getSOS(1 / FS)[0])
+        print(f'Butterworth N={N} fc={fc:.0f} Hz: {sections} biquads, respuesta truncada a {len(model[0])} muestras')
+        for e in range(3, max_exp + 1):
+            run(tf, model, sections, 10**e)
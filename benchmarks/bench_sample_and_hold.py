@@ -0,0 +1,41 @@
+# Benchmark del S&H vectorizado contra el loop original
+# Uso: python -m benchmarks.bench_sample_and_hold [max_exp]   (por defecto 10^6 a 10^8)
+import sys
+import time
+import numpy as np
+from scipy import signal
+
+from src.package.Sampler import sample_and_hold
+
+LOOP_MAX = 10**6 # el loop de Python es demasiado lento por encima de esto
+
+def loop_sample_and_hold(x, samplingSignal):
+    sampled = np.zeros(len(x))
+    last = x[0]
+    for i in range(len(x)):
+        if samplingSignal[i] > 0.5:
+            last = x[i]
+        sampled[i] = last
+    return sampled
+
+def run(n, fs=40000, dc=0.5):
+    t = np.arange(n) / (100*fs)
+    x = np.cos(2*np.pi*1000*t)
+    samplingSignal = 0.5*signal.square(2*np.pi*fs*t, duty=dc) + 0.5
+
+    start = time.perf_counter()
+    sampled = sample_and_hold(x, samplingSignal > 0.5)
+    vec = time.perf_counter() - start
+
+    line = f'n=10^{int(np.log10(n))}  vectorizado: {vec:.3f} s'
+    if n <= LOOP_MAX:
+        start = time.perf_counter()
+        reference = loop_sample_and_hold(x, samplingSignal)
+        loop = time.perf_counter() - start
+        line += f'  loop: {loop:.3f} s  x{loop/vec:.0f}  idéntico: {np.array_equal(sampled, reference)}'
+    print(line)
+
+if __name__ == "__main__":
+    max_exp = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    for e in range(6, max_exp + 1):
+        run(10**e)
@@ -0,0 +1,38 @@
+# Benchmark de la simulación por biquads (SOS) contra lsim para Butterworth de orden 2 a 50
+# Uso: python -m benchmarks.bench_sos_simulation [n_puntos]   (por defecto 10^5)
+import sys
+import time
+import warnings
+import numpy as np
+from scipy import signal
+
+from src.package.transfer_function import TFunction, LSIM, SOS
+
+ORDERS = [2, 4, 6, 8, 10, 15, 20, 30, 40, 50]
+DIVERGENCE_FACTOR = 1e3 # salida de lsim mayor que esto por la amplitud de la entrada
+
+def run(N, n, fs=40000, fc=10000):
+    t = np.arange(n) / (100*fs)
+    x = np.cos(2*np.pi*1000*t) + 0.5*np.cos(2*np.pi*15000*t)
+    z, p, k = signal.butter(N, 2*np.pi*fc, analog=True, output='zpk')
+    tf = TFunction(z, p, k)
+
+    start = time.perf_counter()
+    sos = tf.simulateInputSignal(x, t, engine=SOS)
+    sos_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        lsim = tf.simulateInputSignal(x, t, engine=LSIM)
+    lsim_time = time.perf_counter() - start
+
+    # lsim sobre el sistema completo diverge con órdenes altos: no finito o muy por encima de la escala de la señal
+    diverged = not np.all(np.isfinite(lsim)) or np.max(np.abs(lsim)) > DIVERGENCE_FACTOR*np.max(np.abs(x))
+    error = 'lsim diverge' if diverged else f'{np.max(np.abs(sos - lsim)):.2e}'
+    print(f'N={N:2d}  sos: {sos_time:.3f} s  lsim: {lsim_time:.3f} s  x{lsim_time/sos_time:.0f}  error máximo: {error}')
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10**5
+    for N in ORDERS:
+        run(N, n)
@@ -0,0 +1,50 @@
+# Benchmark de construcción de TFunction (tiempo y memoria por instancia) y del diseño y
+# separación en etapas de un filtro de orden 50
+# Uso: python -m benchmarks.bench_tfunction [instancias]   (por defecto 20000)
+import sys
+import time
+import tracemalloc
+import numpy as np
+from scipy import signal
+
+from src.package.transfer_function import TFunction
+from src.package.Filter import AnalogFilter, LOW_PASS, BUTTERWORTH, CHEBYSHEV
+
+def construction(n):
+    z, p, k = signal.butter(2, 2*np.pi*1000, analog=True, output='zpk')
+    start = time.perf_counter()
+    for i in range(n):
+        TFunction(z, p, k)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    instances = [TFunction(z, p, k) for i in range(1000)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    print(f'construcción: {elapsed/n*1e6:.1f} us/instancia  memoria: {size/len(instances):.0f} B/instancia')
+
+def design(approx, N):
+    params = {
+        "name": "bench", "filter_type": LOW_PASS, "approx_type": approx, "helper_approx": 0, "helper_N": 0,
+        "is_helper": False, "define_with": 0, "N_min": N, "N_max": N, "gain": 1, "denorm": 0,
+        "aa_dB": 40, "ap_dB": 1, "wa": 2*np.pi*20000, "wp": 2*np.pi*10000, "w0": 1000, "bw": [100, 200],
+        "gamma": 10, "tau0": 1e-3, "wrg": 2*np.pi*300,
+    }
+    start = time.perf_counter()
+    filt = AnalogFilter(**params)
+    valid, msg = filt.validate()
+    if not valid:
+        print(f'aproximación {approx} orden {N}: {msg}')
+        return
+    filt.resetStages()
+    filt.orderStagesBySos()
+    elapsed = time.perf_counter() - start
+    print(f'diseño y etapas, aproximación {approx} orden {N}: {elapsed*1e3:.1f} ms ({len(filt.stages)} etapas)')
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    construction(n)
+    design(BUTTERWORTH, 50)
+    design(CHEBYSHEV, 20)
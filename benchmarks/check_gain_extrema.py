@@ -0,0 +1,63 @@
+# Verificación de gain_extrema contra un barrido denso (lineal + logarítmico) de |H(jw)|
+# Incluye diseños donde la versión por raíces del polinomio perdía picos internos y una banda
+# muy por debajo de las raíces donde desbordaba. Termina con código 1 si algún caso falla
+# Uso: python -m benchmarks.check_gain_extrema
+import sys
+import warnings
+import numpy as np
+from scipy import signal
+
+import src.package.Filter as Filter
+from src.package.transfer_function import gain_extrema, zpk_response
+
+SCAN_POINTS = 2*10**6
+RTOL = 1e-9
+
+def params(filter_type, approx_type, **kwargs):
+    p = {"name": "check", "filter_type": filter_type, "approx_type": approx_type, "helper_approx": 0, "helper_N": 0,
+         "is_helper": False, "define_with": 0, "N_min": 1, "N_max": 25, "gain": 1, "denorm": 0, "aa_dB": 40, "ap_dB": 1,
+         "wa": 2*np.pi*20000, "wp": 2*np.pi*10000, "w0": 1000, "bw": [100, 200], "gamma": 10, "tau0": 1e-3, "wrg": 2*np.pi*300}
+    p.update(kwargs)
+    return p
+
+# Bandas en rad/s de la banda de paso de un AnalogFilter, como las usa getEdgeGainsInBP
+def filter_bands(filt):
+    isReject, bp = filt.getBandpassRange()
+    return bp if isReject else [bp]
+
+def scan(z, p, k, wmin, wmax):
+    w = np.concatenate((np.linspace(wmin, wmax, SCAN_POINTS), np.geomspace(max(wmin, wmax*1e-12), wmax, SCAN_POINTS)))
+    g = np.abs(zpk_response(z, p, k, w))
+    return np.min(g), np.max(g)
+
+def check(name, z, p, k, wmin, wmax):
+    _, gmin, _, gmax = gain_extrema(z, p, k, wmin, wmax)
+    smin, smax = scan(z, p, k, wmin, wmax)
+    # los extremos exactos no pueden quedar dentro del rango que encuentra el barrido
+    ok = gmax >= smax*(1 - RTOL) and gmin <= smin*(1 + RTOL)
+    print(f'{name:24s} máx {20*np.log10(gmax):10.6f} dB (barrido {20*np.log10(smax):10.6f})  '
+          f'mín {20*np.log10(gmin):10.6f} dB (barrido {20*np.log10(smin):10.6f})  {"ok" if ok else "FALLA"}')
+    return ok
+
+def cases():
+    designs = [
+        ('BP Cauer', params(Filter.BAND_PASS, Filter.CAUER, wp=[749.3, 1079.0], wa=[749.3/1.05, 1079.0*1.05], ap_dB=2.147, aa_dB=62.7)),
+        ('HP Legendre', params(Filter.HIGH_PASS, Filter.LEGENDRE, wp=2*np.pi*10000, wa=2*np.pi*10000/1.1, ap_dB=1, aa_dB=60)),
+        ('BP Butterworth N=11', params(Filter.BAND_PASS, Filter.BUTTERWORTH, wp=[2*np.pi*9000, 2*np.pi*15000], wa=[2*np.pi*5000, 2*np.pi*30000], N_min=11, N_max=11)),
+        ('BP Legendre N=9', params(Filter.BAND_PASS, Filter.LEGENDRE, wp=[2*np.pi*9000, 2*np.pi*15000], wa=[2*np.pi*5000, 2*np.pi*30000], N_min=9, N_max=9)),
+    ]
+    for name, p in designs:
+        filt = Filter.AnalogFilter(**p)
+        filt.validate()
+        for wmin, wmax in filter_bands(filt):
+            yield name, filt.tf.z, filt.tf.p, filt.tf.k, wmin, wmax
+    wp = 2*np.pi*1e4
+    yield ('ellip HP10',) + signal.ellip(10, 1, 60, wp, 'high', analog=True, output='zpk') + (wp, 100*wp)
+    yield ('ellip LP50',) + signal.ellip(50, 1, 60, wp, analog=True, output='zpk') + (1e-10, wp)
+    yield ('ellip LP50 banda baja',) + signal.ellip(50, 1, 60, 2*np.pi*1e5, analog=True, output='zpk') + (1e-10, 2*np.pi)
+
+if __name__ == "__main__":
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        results = [check(*case) for case in cases()]
+    sys.exit(0 if all(results) else 1)
@@ -92,6 +92,10 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.plt_autoscale.clicked.connect(self.autoscalePlots)
         self.plt_legendpos.activated.connect(self.updatePlot)
         self.plt_grid.stateChanged.connect(self.updatePlot)
+        self.spec_onesided.clicked.connect(self.updateSpectrumOptions)
+        self.spec_welch.clicked.connect(self.updateSpectrumOptions)
+        self.spec_welch_sb.valueChanged.connect(self.updateSpectrumOptions)
+        self.smp_exact.clicked.connect(self.updateExactSampling)
 
         self.sdis_faa.setVisible(False)
         self.sdis_sh.setVisible(False)
@@ -137,6 +141,9 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.input = None
         self.t = None
         self.f = None
+        self.onesidedSpectra = False
+        self.welchParams = None
+        self.simulationEngine = TF.SOS
 
         self.chg_filter_btn.clicked.connect(self.changeSelectedFilter)
         self.addSampler('No')
@@ -171,9 +178,9 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                     if i == 0:
                         self.f = self.filsamplers[i].f
                 else:
-                    intermediateSignal = self.filsamplers[i].tf.simulateInputSignal(intermediateSignal, self.t)
+                    intermediateSignal = self.filsamplers[i].tf.simulateInputSignal(intermediateSignal, self.t, engine=self.simulationEngine)
                     self.datasets[i].parse_from_tf(self.filsamplers[i].tf, self.f)
-                    self.datasets[i].data[0]['xf'] = abs(self.filsamplers[i].tf.getFFT(intermediateSignal))
+                    self.datasets[i].data[0]['xf'] = abs(self.filsamplers[i].tf.getFFT(intermediateSignal, self.onesidedSpectra, *self.welchSegments()))
 
             #necesario para los filtros
             self.datasets[i].data[0]['t'] = self.t
@@ -181,6 +188,49 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
         self.updatePlots()
 
+    # Espectros de un lado (rfft) o centrados para todo el pipeline
+    def setOnesidedSpectra(self, onesided, noPlot=False):
+        self.onesidedSpectra = onesided
+        for i in SAMPLER_INDEXES:
+            self.filsamplers[i].onesided = onesided
+        if self.t is not None and not noPlot:
+            self.rePlotAll()
+
+    # Espectros promediados (Welch) para todo el pipeline: (nperseg, noverlap) o None
+    def setWelchSpectra(self, welchParams, noPlot=False):
+        self.welchParams = welchParams
+        for i in SAMPLER_INDEXES:
+            self.filsamplers[i].welch = welchParams
+        if self.t is not None and not noPlot:
+            self.rePlotAll()
+
+    # Opciones de espectro de la pestaña de gráficos: un lado y segmento de Welch (solapado a la mitad)
+    def updateSpectrumOptions(self):
+        onesided = self.spec_onesided.isChecked()
+        nperseg = self.spec_welch_sb.value()
+        welchParams = (nperseg, nperseg // 2) if self.spec_welch.isChecked() else None
+        if onesided == self.onesidedSpectra and welchParams == self.welchParams:
+            return
+        self.setOnesidedSpectra(onesided, noPlot=True)
+        self.setWelchSpectra(welchParams, noPlot=True)
+        if self.t is not None:
+            self.rePlotAll()
+
+    def updateExactSampling(self):
+        self.setExactSampling(self.smp_exact.isChecked())
+
+    # Muestreo en instantes exactos (interpolando la entrada): permite bajar el sobremuestreo
+    # de la grilla sin perder precisión en los instantes del S&H
+    def setExactSampling(self, exact, aperture=None):
+        for i in [SH, LLA]:
+            self.filsamplers[i].exact = exact
+            self.filsamplers[i].aperture = aperture
+        if self.t is not None:
+            self.rePlotAll()
+
+    def welchSegments(self):
+        return self.welchParams if self.welchParams is not None else (None, None)
+
     def updateSamplers(self, noPlot=False):
         self.filsamplers[SH].fs = self.respd.fs
         self.filsamplers[SH].dc = self.respd.dsh
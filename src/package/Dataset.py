@@ -10,6 +10,18 @@ from collections import defaultdict
 from PyQt5.QtCore import QFileInfo
 from src.package.Dataline import Dataline
 
+BODE_TOLERANCE = 0.1 # dB y grados para el refinamiento de la grilla adaptiva
+
+# Diccionario cuyos valores pueden ser funciones sin argumentos: se evalúan recién
+# cuando se lee el campo (por ejemplo al graficarlo) y se guarda el resultado
+class LazyFields(dict):
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if callable(value):
+            value = value()
+            dict.__setitem__(self, key, value)
+        return value
+
 class Dataset:
     def __init__(self, filepath='', title='', origin=''):
         qfi = QFileInfo(filepath)
@@ -145,8 +157,12 @@ class Dataset:
                         self.suggestedYsource = chnum
             csv_file.close()
 
+    # Sin grilla de frecuencias se usa la adaptiva de la transferencia
     def parse_from_tf(self, tf, fin=None):
-        f, g, ph, gd = tf.getBode(f=fin)
+        if fin is None:
+            f, g, ph, gd = tf.getBode(adaptive=True, tol=BODE_TOLERANCE)
+        else:
+            f, g, ph, gd = tf.getBode(f=fin)
         z, p = tf.getZP()
         self.data = [{}]
         self.zeros = [{}]
@@ -161,19 +177,19 @@ class Dataset:
         self.suggestedYsource = 'g'
 
     def parse_from_sampler(self, s):
-        self.data = [{}]
+        self.data = [LazyFields()]
         self.zeros = [{}]
         self.poles = [{}]
         self.data[0]['t'] = s.t
-        self.data[0]['f'] = s.f
-        self.data[0]['xs'] = s.samplingSignal
-        self.data[0]['gs'] = s.samplingSignalG
-        self.data[0]['phs'] = s.samplingSignalPH
-        self.data[0]['gds'] = s.samplingSignalGD
+        self.data[0]['f'] = lambda: s.f
+        self.data[0]['xs'] = lambda: s.samplingSignal
+        self.data[0]['gs'] = lambda: s.samplingSignalG
+        self.data[0]['phs'] = lambda: s.samplingSignalPH
+        self.data[0]['gds'] = lambda: s.samplingSignalGD
         self.data[0]['x'] = s.sampled
-        self.data[0]['g'] = s.sampledG
-        self.data[0]['ph'] = s.sampledPH
-        self.data[0]['gd'] = s.sampledGD
+        self.data[0]['g'] = lambda: s.sampledG
+        self.data[0]['ph'] = lambda: s.sampledPH
+        self.data[0]['gd'] = lambda: s.sampledGD
         self.suggestedXsource = 'f'
         self.suggestedYsource = 'g'
             
@@ -1,7 +1,7 @@
 from inspect import trace
 import sys
 import traceback
-from src.package.transfer_function import TFunction
+from src.package.transfer_function import TFunction, Cascade, RootIndex, zpk_group_delay, cascade_sos, sos_filter
 import scipy.signal as signal
 import numpy as np
 from numpy.polynomial import Polynomial
@@ -275,8 +275,7 @@ class AnalogFilter():
             while True:
                 N, D = signal.bessel(self.N, 1, analog=True, output='ba', norm='delay') #produce un delay de 1/1 seg (cambiar el segundo parámetro)
                 z, p, k = signal.bessel(self.N, 1, analog=True, output='zpk', norm='delay')
-                tf2 = TFunction(z, p, k, N, D)
-                if(self.N == self.N_max or (1 - tf2.gd_at(self.wrg_n) <= self.gamma/100)): #si el gd es menor-igual que el esperado, estamos
+                if(self.N == self.N_max or (1 - zpk_group_delay(z, p, self.wrg_n) <= self.gamma/100)): #si el gd es menor-igual que el esperado, estamos
                     self.tf_norm = TFunction(z, p, k, N, D)
                     break
                 self.N += 1
@@ -290,9 +289,8 @@ class AnalogFilter():
                     z = []
                     p = select_roots(Polynomial(gauss_poly))
                     p0 = np.prod(p)
-                    tf2 = TFunction(z, p, p0)
-                    if(self.N == self.N_max or (1 - tf2.gd_at(self.wrg_n) <= self.gamma/100)): #si el gd es menor-igual que el esperado, estamos
-                        g0 = tf2.gd_at(0)                       
+                    if(self.N == self.N_max or (1 - zpk_group_delay(z, p, self.wrg_n) <= self.gamma/100)): #si el gd es menor-igual que el esperado, estamos
+                        g0 = zpk_group_delay(z, p, 0)
                         p = [r * g0 for r in p]
                         self.tf_norm = TFunction(z, p, p0)
                         break
@@ -389,10 +387,10 @@ class AnalogFilter():
 
     def resetStages(self):
         self.remainingGain = self.gain
-        self.remainingZeros = self.tf.z.tolist()
-        self.remainingPoles = self.tf.p.tolist()
+        self.remainingZeros = RootIndex(self.tf.z)
+        self.remainingPoles = RootIndex(self.tf.p)
         self.stages = []
-        self.implemented_tf = TFunction(1, 1, normalize=False)
+        self.implemented_tf = Cascade()
 
     def addStage(self, z_arr, p_arr, gain, pz_in_hz=False):
         if(pz_in_hz):
@@ -427,7 +425,7 @@ class AnalogFilter():
         newStage_tf = TFunction(z_arr, p_arr, append_gain, normalize=True)
 
         self.stages.append(newStage_tf)
-        self.implemented_tf.appendStage(newStage_tf)
+        self.implemented_tf.append(newStage_tf)
         self.remainingGain /= append_gain
         for z in z_arr:
             self.remainingZeros.remove(z)
@@ -437,21 +435,16 @@ class AnalogFilter():
         
 
     def removeStage(self, i):
-        self.implemented_tf.removeStage(self.stages[i])
+        self.implemented_tf.remove(self.stages[i])
         self.stages[i].denormalize()
         self.remainingGain = self.remainingGain * np.real(self.stages[i].gain)
-        for sz in self.stages[i].z:
-            add_list = []
-            for z in self.tf.z:
-                if(np.isclose(sz, z)):
-                    add_list.append(z)
-            self.remainingZeros += add_list
-        for sp in self.stages[i].p:
-            add_list = []
-            for p in self.tf.p:
-                if(np.isclose(sp, p)):
-                    add_list.append(p)
-            self.remainingPoles += add_list
+        # Vuelven las raíces originales del filtro que corresponden a las de la etapa
+        zeros, poles = RootIndex(self.tf.z), RootIndex(self.tf.p)
+        for remaining, original, roots in [(self.remainingZeros, zeros, self.stages[i].z), (self.remainingPoles, poles, self.stages[i].p)]:
+            for r in roots:
+                match = original.remove(r)
+                if match is not None:
+                    remaining.add(match)
         self.stages.pop(i)
 
     def addHelperFilters(self):
@@ -494,7 +487,7 @@ class AnalogFilter():
         self.stages[index1] = temp
     
     def orderStagesBySos(self):
-        sos = signal.zpk2sos(self.remainingZeros, self.remainingPoles, self.remainingGain, pairing='minimal', analog=True)
+        sos = signal.zpk2sos(self.remainingZeros.tolist(), self.remainingPoles.tolist(), self.remainingGain, pairing='minimal', analog=True)
         for sosSection in sos:
             z_arr, p_arr, gain = signal.tf2zpk(sosSection[0:3], sosSection[3:6])
             newRemainingZeros = len(self.remainingZeros) - len(z_arr)
@@ -508,25 +501,26 @@ class AnalogFilter():
             newStage_tf = TFunction(z_arr, p_arr, append_gain, normalize=True)
 
             self.stages.append(newStage_tf)
-            self.implemented_tf.appendStage(newStage_tf)
+            self.implemented_tf.append(newStage_tf)
             self.remainingGain /= append_gain
             
             for z in z_arr:
-                del_list = []
-                for rz in self.remainingZeros:
-                    if(np.isclose(z, rz)):
-                        del_list.append(rz)
-                for d in del_list:
-                    self.remainingZeros.remove(d)
+                self.remainingZeros.remove(z)
             for p in p_arr:
-                del_list = []
-                for rp in self.remainingPoles:
-                    if(np.isclose(p, rp)):
-                        del_list.append(rp)
-                for d in del_list:
-                    self.remainingPoles.remove(d)
+                self.remainingPoles.remove(p)
         return True
 
+    # Biquads digitales de la cascada de etapas implementadas, en el orden de las etapas
+    def getStagesSOS(self, dt):
+        return cascade_sos([stage.getSOS(dt) for stage in self.stages])
+
+    # Simula la cascada de etapas con grilla uniforme. zi es el estado que devolvió el bloque anterior
+    def simulateStages(self, xi, time, zi=None):
+        if len(self.stages) == 0:
+            return np.array(xi, dtype=np.float64), zi
+        sos, rest, d = self.getStagesSOS(time[1] - time[0])
+        return sos_filter(sos, rest, xi, zi)
+
     def getBandpassRange(self):
         fakezero = 1e-10
         if self.filter_type == LOW_PASS:
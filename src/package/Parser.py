@@ -1,7 +1,10 @@
 import sympy as sym
 from sympy import Symbol, S, oo
+from functools import lru_cache
+import re
 
 s = sym.symbols('s')
+PARSE_CACHE_SIZE = 256
 
 #Puntaje asignado a la complejidad para la simplificación de sympy
 def determinar_complejidad(expr):
@@ -10,6 +13,39 @@ def determinar_complejidad(expr):
     count = count.replace(Symbol, type(S.One)) #A todo lo demás le doy un 1
     return count
 
+# Memorias compartidas por todo el proceso: el diseño de filtros vuelve a parsear y a simplificar
+# las mismas expresiones muchas veces. Las expresiones de sympy son inmutables y se comparan por
+# estructura, así que sirven de clave y se pueden devolver sin copiar
+# Sin espacios salvo uno entre dos nombres o números (ahí separan factores: 's 2' no es 's2')
+def normalize_text(txt):
+  txt = re.sub(r'\s+', ' ', txt.strip())
+  return re.sub(r' ?([^\w. ]) ?', r'\1', txt)
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_text(txt):
+  return sym.parsing.sympy_parser.parse_expr(txt, transformations = 'all')
+
+# Expresión cancelada y su fracción (numerador, denominador)
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def cancel_expression(expr):
+  symEx = sym.cancel(expr)
+  return symEx, sym.fraction(symEx)
+
+# Coeficientes de numerador y denominador en potencias decrecientes de s
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def fraction_nd(fractionEx):
+  N = sym.Poly(fractionEx[0]).all_coeffs() if (s in fractionEx[0].free_symbols) else [fractionEx[0].evalf()]
+  D = sym.Poly(fractionEx[1]).all_coeffs() if (s in fractionEx[1].free_symbols) else [fractionEx[1].evalf()]
+  return tuple(N), tuple(D)
+
+# Aciertos y fallos de cada memoria (CacheInfo de functools)
+def cache_info():
+  return {'text': parse_text.cache_info(), 'expression': cancel_expression.cache_info(), 'nd': fraction_nd.cache_info()}
+
+def cache_clear():
+  for cached in (parse_text, cancel_expression, fraction_nd):
+    cached.cache_clear()
+
 class ExprParser():
     def __init__(self, txt='', expr = None, *args):
       self.symEx = None
@@ -26,7 +62,7 @@ class ExprParser():
 
     def setTxt(self, txt):
       self.txt = txt
-      self.symEx = sym.parsing.sympy_parser.parse_expr(txt, transformations = 'all')
+      self.symEx = parse_text(normalize_text(txt))
       self.simplify()
 
     def setExpression(self, expr):
@@ -34,17 +70,15 @@ class ExprParser():
       self.simplify()
 
     def simplify(self):
-      self.symEx = sym.cancel(self.symEx) # sym.simplify(self.symEx, ratio=oo, measure=determinar_complejidad)
-      self.fractionEx = sym.fraction(self.symEx)
+      self.symEx, self.fractionEx = cancel_expression(self.symEx) # sym.simplify(self.symEx, ratio=oo, measure=determinar_complejidad)
 
     def transform(self, transformation):
       self.symEx = self.symEx.subs(s, transformation)
       self.simplify()
 
     def getND(self):
-      N = sym.Poly(self.fractionEx[0]).all_coeffs() if (s in self.fractionEx[0].free_symbols) else [self.fractionEx[0].evalf()]
-      D = sym.Poly(self.fractionEx[1]).all_coeffs() if (s in self.fractionEx[1].free_symbols) else [self.fractionEx[1].evalf()]
-      return N, D
+      N, D = fraction_nd(self.fractionEx)
+      return list(N), list(D)
 
     def getLatex(self, txt=None):
       if not txt:
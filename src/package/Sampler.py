@@ -1,77 +1,525 @@
 
 import numpy as np
 from scipy import signal
-from scipy.fft import fftfreq, fftshift, fft
-from scipy.interpolate import interp1d
+from collections import OrderedDict
 from matplotlib import pyplot as plt
+from . import spectrum
 
 SH, NATURAL, NO_SAMPLE = range(3)
+SPECTRUM_ANALYTIC, SPECTRUM_FFT = range(2) # FFT: validación del espectro analítico de la señal de muestreo
+
+# Índice de la última muestra "tomada" para cada posición (forward-fill por índice).
+# Donde todavía no se tomó ninguna muestra devuelve -1
+def hold_indices(track):
+    idx = np.where(track, np.arange(len(track)), -1)
+    np.maximum.accumulate(idx, out=idx)
+    return idx
+
+# Equivalente vectorizado del loop de S&H: sigue a x mientras track es verdadero
+# y mantiene el último valor tomado mientras es falso
+def sample_and_hold(x, track, initial=None):
+    x = np.asarray(x)
+    idx = hold_indices(track)
+    held = x[np.maximum(idx, 0)]
+    if initial is not None:
+        held[idx < 0] = initial
+    return held
+
+# Representación compacta de una señal escalonada sobre la grilla t: guarda solo el índice
+# donde empieza cada tramo (starts) y su valor (values), o sea los t_d, x_d de sampleAndHold
+# Se expande a densa recién cuando hace falta (gráficos, lsim, FFT) a través de np.asarray
+class HeldSignal():
+    def __init__(self, t, starts, values):
+        self.t = t
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.values = np.asarray(values)
+
+    @property
+    def t_d(self):
+        return np.asarray(self.t)[self.starts]
+
+    @property
+    def x_d(self):
+        return self.values
+
+    @property
+    def size(self):
+        return len(self.t)
+
+    def __len__(self):
+        return len(self.t)
+
+    def __array__(self, dtype=None, copy=None):
+        dense = self.dense()
+        return dense if dtype is None else dense.astype(dtype, copy=False)
+
+    def dense(self):
+        return np.repeat(self.values, np.diff(np.append(self.starts, len(self.t))))
+
+    # Valor de la señal en los índices pedidos (de la grilla t)
+    def valuesAt(self, indices):
+        return self.values[np.searchsorted(self.starts, indices, side='right') - 1]
+
+    # Producto exacto con una señal densa que también es escalonada (p. ej. la cuadrada de
+    # muestreo): el resultado es constante entre los flancos de cualquiera de las dos
+    def multiplyStepwise(self, other):
+        other = np.asarray(other)
+        edges = np.flatnonzero(other[1:] != other[:-1]) + 1
+        starts = np.union1d(self.starts, edges)
+        return HeldSignal(self.t, starts, self.valuesAt(starts) * other[starts])
+
+# Versión compacta de sample_and_hold: cada muestra tomada abre un tramo nuevo
+def held_from_track(x, track, t, initial=None):
+    x = np.asarray(x)
+    if len(x) == 0:
+        return HeldSignal(t, [], [])
+    tracked = np.flatnonzero(track)
+    if len(tracked) > 0 and tracked[0] == 0:
+        return HeldSignal(t, tracked, x[tracked].astype(np.float64, copy=False))
+    first = x[0] if initial is None else initial
+    starts = np.concatenate(([0], tracked))
+    values = np.concatenate(([first], x[tracked])).astype(np.float64, copy=False)
+    return HeldSignal(t, starts, values)
+
+# Señal de muestreo: cuadrada entre 0 y 1 con período 1/fs y ciclo de trabajo dc
+def sampling_waveform(fs, dc, t):
+    return 0.5*signal.square(2*np.pi*fs*np.asarray(t), duty=dc) + 0.5
+
+# Fase dentro del período de muestreo (en [0, 1)) y número de período de cada instante
+def sampling_phase(fs, t):
+    ft = fs*np.asarray(t)
+    k = np.floor(ft)
+    return ft - k, k
+
+# Compuerta del muestreo natural con flancos exactos: vale 1 durante los primeros width
+# (fracción del período) de cada período
+def exact_gate(fs, t, width):
+    phase, k = sampling_phase(fs, t)
+    return (phase < width).astype(np.float64)
+
+# Interpolación lineal de x(t) en los instantes pedidos (constante fuera del rango de t)
+# Cada valor depende solo de las dos muestras vecinas, así da lo mismo en streaming
+def interpolate_at(instants, t, x):
+    t = np.asarray(t)
+    if len(t) < 2:
+        return np.full(len(instants), x[0], dtype=np.float64)
+    j = np.clip(np.searchsorted(t, instants, side='right') - 1, 0, len(t) - 2)
+    w = np.clip((instants - t[j]) / (t[j + 1] - t[j]), 0, 1)
+    return x[j] + w*(x[j + 1] - x[j])
+
+# S&H con instantes exactos: mientras la fase es menor que dc sigue a la entrada y después
+# mantiene x((k + dc)/fs), interpolado linealmente entre las muestras de la grilla
+# carried es el (período, valor) retenido que viene de un bloque anterior, y se devuelve
+# actualizado para poder seguir en el bloque siguiente
+def exact_sample_and_hold(x, t, fs, dc, carried=None):
+    x = np.asarray(x, dtype=np.float64)
+    phase, k = sampling_phase(fs, t)
+    track = phase < dc
+    hold = ~track
+    out = x.copy()
+    if np.any(hold):
+        kk = k[hold]
+        first = np.ones(len(kk), dtype=bool)
+        first[1:] = kk[1:] != kk[:-1]
+        periods = kk[first]
+        # por redondeo el instante podría caer apenas después de la primera muestra retenida
+        instants = np.minimum((periods + dc)/fs, np.asarray(t)[hold][first])
+        values = interpolate_at(instants, t, x)
+        if carried is not None and carried[0] == periods[0]:
+            values[0] = carried[1]
+        out[hold] = values[np.cumsum(first) - 1]
+        carried = (periods[-1], values[-1])
+    return out, track, k, carried
+
+# Versión compacta de la salida de exact_sample_and_hold: un tramo por muestra seguida
+# y uno por cada período retenido
+def held_from_runs(out, track, k, t):
+    newRun = np.ones(len(out), dtype=bool)
+    newRun[1:] = track[1:] | track[:-1] | (k[1:] != k[:-1])
+    starts = np.flatnonzero(newRun)
+    return HeldSignal(t, starts, out[starts])
+
+# Cache LRU de señales de muestreo (y sus espectros) compartida entre todos los Sampler
+# La clave es (fs, dc, t0, dt, len): dos muestreadores con la misma fs y el mismo duty
+# sobre la misma grilla reutilizan la misma cuadrada
+class WaveformCache():
+    def __init__(self, maxsize=4):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, fs, dc, t):
+        t = np.asarray(t)
+        key = (fs, dc, t[0], t[1] - t[0] if len(t) > 1 else 0, len(t))
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        self.misses += 1
+        samplingSignal = sampling_waveform(fs, dc, t)
+        samplingSignal.setflags(write=False) # se comparte entre instancias
+        entry = {'samplingSignal': samplingSignal}
+        self.entries[key] = entry
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def cacheInfo(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries), 'maxsize': self.maxsize}
+
+waveformCache = WaveformCache()
+
+# Calcula (una sola vez) un producto derivado de la señal de muestreo dentro de la entrada de la cache
+def waveform_product(entry, name, compute):
+    if name not in entry:
+        entry[name] = compute()
+    return entry[name]
 
 class Sampler():
     def __init__(self, fs, dc, type):
         assert (fs > 0 and 0 <= dc and dc <= 1 and 0 <= type and type <= NO_SAMPLE)
-        self.fs = fs
-        self.dc = dc
+        self._cache = {}
+        self._fs = fs
+        self._dc = dc
+        self._x = []
+        self._t = []
+        self._sampled = []
+        self._sampledKey = None # configuración con la que se obtuvo _sampled (None: hay que recalcular)
+        self._onesided = False
+        self._welch = None
+        self._samplingSpectrum = SPECTRUM_ANALYTIC
+        self.compact = False # salida del S&H como HeldSignal en vez de arreglo denso
+        # Instantes de muestreo exactos (k/fs) interpolando la entrada, en vez de los de la grilla
+        # aperture: ancho del pulso del muestreo natural en segundos (None: dc/fs)
+        self.exact = False
+        self.aperture = None
+        self._held = None # estado del modo streaming (último valor retenido)
+        self._prev = None
+        self._carried = None
         self.type = type
         self.enabled = True
 
-        self.t = []
-        self.f = []
-        self.samplingSignal = []
-        self.samplingSignalG = []
-        self.samplingSignalPH = []
-        self.samplingSignalGD = []
-        self.sampled = []
-        self.sampledG = []
-        self.sampledPH = []
-        self.sampledGD = []
+    # Los productos espectrales se calculan recién cuando alguien los pide y quedan
+    # guardados hasta que cambie x, t, fs o dc (o se vuelva a muestrear)
+    def _cached(self, name, compute):
+        if name not in self._cache:
+            self._cache[name] = compute()
+        return self._cache[name]
+
+    def _invalidate(self, sampledOnly=False):
+        if sampledOnly:
+            for name in [name for name in self._cache if name.startswith('sampled')]:
+                del self._cache[name]
+        else:
+            self._cache.clear()
+            self._sampledKey = None
+
+    @property
+    def fs(self):
+        return self._fs
+
+    @fs.setter
+    def fs(self, fs):
+        if fs != self._fs:
+            self._fs = fs
+            self._invalidate()
+
+    @property
+    def dc(self):
+        return self._dc
+
+    @dc.setter
+    def dc(self, dc):
+        if dc != self._dc:
+            self._dc = dc
+            self._invalidate()
+
+    # Espectros de un solo lado (rfft) en vez de centrados
+    @property
+    def onesided(self):
+        return self._onesided
+
+    @onesided.setter
+    def onesided(self, onesided):
+        if onesided != self._onesided:
+            self._onesided = onesided
+            self._invalidate()
+
+    # Espectro promediado (Welch): None o (nperseg, noverlap)
+    @property
+    def welch(self):
+        return self._welch
+
+    @welch.setter
+    def welch(self, welch):
+        if welch != self._welch:
+            self._welch = welch
+            self._invalidate()
+
+    # Largo de la FFT: la señal entera o un segmento de Welch
+    def _spectrumLength(self):
+        if self.welch is None:
+            return len(self.t)
+        return min(self.welch[0], len(self.t))
+
+    def _estimate(self, x):
+        nperseg, noverlap = self.welch if self.welch is not None else (None, None)
+        return spectrum.estimate(x, onesided=self.onesided, nperseg=nperseg, noverlap=noverlap)
 
-        
+    # Cómo se obtiene el espectro de la señal de muestreo: en forma cerrada (no depende
+    # del largo de la señal) o por FFT de la cuadrada sobremuestreada
+    @property
+    def samplingSpectrum(self):
+        return self._samplingSpectrum
 
+    @samplingSpectrum.setter
+    def samplingSpectrum(self, method):
+        if method != self._samplingSpectrum:
+            self._samplingSpectrum = method
+            self._invalidate()
+
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, x):
+        if x is not self._x:
+            self._x = x
+            self._invalidate()
+
+    @property
+    def t(self):
+        return self._t
+
+    @t.setter
+    def t(self, t):
+        if t is not self._t:
+            self._t = t
+            self._invalidate()
+
+    @property
+    def sampled(self):
+        return self._sampled
+
+    @sampled.setter
+    def sampled(self, sampled):
+        if sampled is not self._sampled:
+            self._sampled = sampled
+            self._sampledKey = None
+            self._invalidate(sampledOnly=True)
+
+    @property
+    def f(self):
+        if len(self.t) < 2:
+            return []
+        return self._cached('f', lambda: spectrum.frequencies(self._spectrumLength(), self.t[1]-self.t[0], onesided=self.onesided))
+
+    def _waveform(self):
+        return self._cached('waveform', lambda: waveformCache.get(self.fs, self.dc, self.t))
+
+    @property
+    def samplingSignal(self):
+        if len(self.t) == 0:
+            return []
+        return self._waveform()['samplingSignal']
+
+    def _samplingProduct(self, name, compute):
+        if self.samplingSpectrum == SPECTRUM_ANALYTIC:
+            return self._cached(name, compute)
+        return waveform_product(self._waveform(), (name, self.onesided, self.welch), compute)
+
+    # Espectro de la señal de muestreo sobre una grilla cualquiera (por defecto self.f)
+    def samplingSignalSpectrum(self, f=None):
+        if f is None:
+            f = self.f
+        t0 = self.t[0] if len(self.t) > 0 else 0
+        return spectrum.pulse_train_spectrum(self.fs, self.dc, f, t0=t0)
+
+    @property
+    def samplingSignalFreq(self):
+        if len(self.t) == 0:
+            return []
+        if self.samplingSpectrum == SPECTRUM_ANALYTIC:
+            return self._cached('samplingSignalFreq', lambda: self.samplingSignalSpectrum())
+        return self._samplingProduct('samplingSignalFreq', lambda: self._estimate(self.samplingSignal))
+
+    @property
+    def samplingSignalG(self):
+        return self._samplingProduct('samplingSignalG', lambda: spectrum.magnitude(self.samplingSignalFreq))
+
+    @property
+    def samplingSignalPH(self):
+        return self._samplingProduct('samplingSignalPH', lambda: spectrum.phase(self.samplingSignalFreq))
+
+    @property
+    def samplingSignalGD(self):
+        return self._samplingProduct('samplingSignalGD', lambda: spectrum.group_delay(self.samplingSignalPH, self.f))
+
+    @property
+    def sampledFreq(self):
+        if len(self.sampled) == 0:
+            return []
+        return self._cached('sampledFreq', lambda: self._estimate(self.sampled))
+
+    @property
+    def sampledG(self):
+        return self._cached('sampledG', lambda: spectrum.magnitude(self.sampledFreq))
+
+    @property
+    def sampledPH(self):
+        return self._cached('sampledPH', lambda: spectrum.phase(self.sampledFreq))
+
+    @property
+    def sampledGD(self):
+        return self._cached('sampledGD', lambda: spectrum.group_delay(self.sampledPH, self.f))
+
+    # Si no cambió nada desde el último muestreo (x, t, fs, dc ni el modo) se devuelve la misma
+    # salida y se conservan sus espectros
     def Sample(self, x, t):
         self.x = x
         self.t = t
-        self.f  = fftshift(fftfreq((self.x.size), d=(self.t[1]-self.t[0])))
-        self.samplingSignal = 0.5*signal.square(2*np.pi*self.fs*self.t, duty=self.dc) + 0.5
-        self.samplingSignalFreq = fftshift(fft(self.samplingSignal))/self.samplingSignal.size
-        self.samplingSignalG = np.abs(self.samplingSignalFreq)
-        self.samplingSignalPH = np.unwrap(np.angle(self.samplingSignalFreq, deg=True))
-        self.samplingSignalGD = (-1) * [(self.samplingSignalPH[i+1]-self.samplingSignalPH[i])/(self.f[i+1] - self.f[i]) for i in range(len(self.f)-1)]
-        self.samplingSignalGD.append(self.samplingSignalPH[-1])
-
-        self.sampled = np.zeros(len(t))
-
-        self.interpol = interp1d(t, x)
+        key = (self.type, self.enabled, self.exact, self.aperture, self.compact)
+        if key == self._sampledKey:
+            return self.sampled
 
         if not self.enabled:
             self.sampled = self.x
             
         else:
             if self.type == NATURAL:
-                self.sampled = self.x * self.samplingSignal
+                gate = self.samplingSignal if not self.exact else exact_gate(self.fs, self.t, self._gateWidth())
+                if isinstance(self.x, HeldSignal):
+                    self.sampled = self.x.multiplyStepwise(gate)
+                else:
+                    self.sampled = self.x * gate
 
                 
             elif self.type == SH:
-                last = self.x[0]
-                for i in range(len(self.t)):
-                    sampling = self.samplingSignal[i] > 0.5
-                    if sampling:
-                        last = self.x[i]
-                    self.sampled[i] = last
+                if self.exact:
+                    sampled, track, k, carried = exact_sample_and_hold(self.x, self.t, self.fs, self.dc)
+                    self.sampled = held_from_runs(sampled, track, k, self.t) if self.compact else sampled
+                elif self.compact:
+                    self.sampled = held_from_track(self.x, self.samplingSignal > 0.5, self.t)
+                else:
+                    self.sampled = sample_and_hold(self.x, self.samplingSignal > 0.5).astype(np.float64, copy=False)
 
             else:
                 self.sampled = self.x
 
-        self.sampledFreq = fftshift(fft(self.sampled))/self.x.size
-        self.sampledG = np.abs(self.sampledFreq)
-        self.sampledPH = np.unwrap(np.angle(self.sampledFreq, deg=True))
-        self.sampledGD = (-1) * [(self.sampledPH[i+1]-self.sampledPH[i])/(self.f[i+1] - self.f[i]) for i in range(len(self.f)-1)]
-        self.sampledGD.append(self.sampledPH[-1])
-
+        self._sampledKey = key
         return self.sampled
 
+    # Modo streaming: procesa la señal de a bloques consecutivos con memoria acotada
+    # La cuadrada se evalúa sobre los tiempos absolutos de cada bloque (la fase queda
+    # continua entre bloques) y el valor retenido del S&H pasa de un bloque al siguiente
+    # Concatenar las salidas da exactamente lo mismo que Sample sobre la señal entera
+    def resetStream(self):
+        self._held = None
+        self._prev = None
+        self._carried = None
+
+    def processChunk(self, x_chunk, t_chunk):
+        x_chunk = np.asarray(x_chunk)
+        if len(x_chunk) == 0:
+            return np.zeros(0)
+        if self._held is None:
+            self._held = x_chunk[0]
+
+        if not self.enabled or self.type == NO_SAMPLE:
+            out = x_chunk
+        elif self.type == NATURAL and self.exact:
+            out = x_chunk * exact_gate(self.fs, t_chunk, self._gateWidth())
+        elif self.type == NATURAL:
+            out = x_chunk * sampling_waveform(self.fs, self.dc, t_chunk)
+        elif self.exact:
+            # la última muestra del bloque anterior hace falta para interpolar los instantes
+            # que caen entre los dos bloques
+            t_ext, x_ext = np.asarray(t_chunk), x_chunk
+            if self._prev is not None:
+                t_ext = np.concatenate(([self._prev[0]], t_ext))
+                x_ext = np.concatenate(([self._prev[1]], x_ext))
+            out, track, k, self._carried = exact_sample_and_hold(x_ext, t_ext, self.fs, self.dc, self._carried)
+            out = out[len(t_ext) - len(x_chunk):]
+        else:
+            track = sampling_waveform(self.fs, self.dc, t_chunk) > 0.5
+            out = sample_and_hold(x_chunk, track, initial=self._held).astype(np.float64, copy=False)
+        self._held = out[-1]
+        self._prev = (t_chunk[-1], x_chunk[-1])
+        return out
+
+    def _gateWidth(self):
+        return self.dc if self.aperture is None else self.aperture*self.fs
+
+    # Barrido de fs y ciclo de trabajo: evalúa todas las combinaciones en pasadas 2D (una fila
+    # por combinación), de a tantas filas como entren en memory bytes de arreglos intermedios
+    # Sigue la configuración del sampler (exact, aperture, onesided, welch), así que cada fila
+    # coincide con lo que daría Sample con ese fs y dc
+    # Devuelve la grilla de frecuencias, los cubos (fs, dc, ...) de señales muestreadas y de
+    # módulos de sus espectros, y la energía por encima de fs/2 (absoluta y relativa al total)
+    def sweep(self, x, t, fs_values, dc_values, memory=2**28):
+        x = np.asarray(x)
+        t = np.asarray(t)
+        fs_values = np.atleast_1d(np.asarray(fs_values, dtype=np.float64))
+        dc_values = np.atleast_1d(np.asarray(dc_values, dtype=np.float64))
+        FS, DC = [a.ravel() for a in np.meshgrid(fs_values, dc_values, indexing='ij')]
+        n = len(t)
+        m = n if self.welch is None else min(self.welch[0], n)
+        f = spectrum.frequencies(m, t[1] - t[0], onesided=self.onesided)
+        weights = np.ones(len(f))
+        if self.onesided:
+            weights[1:(m + 1)//2] = 2 # los bins negativos que no están en rfft
+
+        sampled = np.empty((len(FS), n))
+        G = np.empty((len(FS), len(f)))
+        aliasEnergy = np.empty(len(FS))
+        aliasRatio = np.empty(len(FS))
+        rows = max(1, int(memory // (6 * 8 * n)))
+        for first in range(0, len(FS), rows):
+            fs = FS[first:first + rows, np.newaxis]
+            dc = DC[first:first + rows, np.newaxis]
+            if not self.enabled or self.type == NO_SAMPLE:
+                batch = np.broadcast_to(x, (len(fs), n))
+            elif self.exact and self.type == NATURAL:
+                batch = x * exact_gate(fs, t, dc if self.aperture is None else self.aperture*fs)
+            elif self.exact:
+                batch = np.array([exact_sample_and_hold(x, t, fsi, dci)[0] for fsi, dci in zip(fs[:, 0], dc[:, 0])])
+            else:
+                samplingSignal = 0.5*signal.square(2*np.pi*fs*t, duty=dc) + 0.5
+                if self.type == NATURAL:
+                    batch = x * samplingSignal
+                else:
+                    idx = np.where(samplingSignal > 0.5, np.arange(n), -1)
+                    np.maximum.accumulate(idx, axis=1, out=idx)
+                    batch = x[np.maximum(idx, 0)]
+            sampled[first:first + rows] = batch
+            if self.welch is None:
+                g = spectrum.magnitude(spectrum.spectrum(batch, onesided=self.onesided))
+            else:
+                g = np.array([spectrum.magnitude(self._estimate(row)) for row in batch])
+            G[first:first + rows] = g
+            energy = weights * g**2
+            aliasEnergy[first:first + rows] = np.sum(energy * (np.abs(f) > fs/2), axis=1)
+            aliasRatio[first:first + rows] = aliasEnergy[first:first + rows] / np.sum(energy, axis=1)
+
+        shape = (len(fs_values), len(dc_values))
+        return f, sampled.reshape(shape + (n,)), G.reshape(shape + (len(f),)), aliasEnergy.reshape(shape), aliasRatio.reshape(shape)
+
     def setEnabled(self, enable):
         self.enabled = enable
+
+    # Vista de dos lados de un producto espectral calculado con onesided=True
+    def twoSided(self, name):
+        values = getattr(self, name)
+        if not self.onesided:
+            return values
+        return spectrum.mirror(values, self._spectrumLength(), odd=name in ['f', 'samplingSignalPH', 'sampledPH'])
     """
     def sampleAndHold(self, x, t, ts):
         xSampled = np.zeros(len(t))
@@ -83,12 +531,14 @@ class Sampler():
                     j+=1
         return xSampled
     """
+    # j avanza como mucho un lugar por muestra: j[i+1] = min(j[i] + 1, c[i]) con
+    # c[i] la cantidad de instantes t_d[1:] <= t[i] (t_d ordenado)
     def sampleAndHold(self, t_d, x_d, t):
-        x = np.zeros(len(t))
-        j = 0
-        for i in range(len(t)):
-            x[i] = x_d[j]
-            if  j < len(t_d) - 1:
-                if t[i] >= t_d[j+1]:               
-                    j+=1
-        return x
\ No newline at end of file
+        t_d = np.asarray(t_d)
+        c = np.searchsorted(t_d[1:], t, side='right')
+        i = np.arange(len(t))
+        j = np.empty(len(t), dtype=np.int64)
+        if len(t) > 0:
+            j[0] = 0
+            j[1:] = np.minimum(np.minimum.accumulate(c[:-1] - i[:-1]) + i[:-1], i[1:])
+        return np.asarray(x_d, dtype=np.float64)[j]
\ No newline at end of file
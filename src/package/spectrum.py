@@ -0,0 +1,106 @@
+import numpy as np
+from scipy.fft import fftfreq, fftshift, fft, rfftfreq, rfft
+from scipy.signal import get_window
+
+WELCH_BATCH_SIZE = 2**22 # muestras (segmentos x nperseg) que se procesan a la vez
+
+# Grilla de frecuencias para una señal de n muestras separadas dt
+# Centrada (dos lados) o solo frecuencias no negativas (un lado, rfft)
+def frequencies(n, dt, onesided=False):
+    if onesided:
+        return rfftfreq(n, d=dt)
+    return fftshift(fftfreq(n, d=dt))
+
+# Espectro normalizado por la cantidad de muestras (sobre el último eje: acepta una señal
+# por fila). Con onesided usa rfft: para señales reales es la mitad de tiempo y de memoria
+def spectrum(x, onesided=False):
+    x = np.asarray(x)
+    if onesided:
+        return rfft(x, axis=-1)/x.shape[-1]
+    return fftshift(fft(x, axis=-1), axes=-1)/x.shape[-1]
+
+# Arma el espectro de dos lados (centrado) a partir del de un lado usando la simetría
+# hermítica de las señales reales. n es el largo de la señal original
+# Con odd=True la mitad negativa se niega en vez de conjugarse (frecuencias, fase)
+def mirror(xf, n, odd=False):
+    xf = np.asarray(xf)
+    negatives = xf[1:n//2 + 1][::-1]
+    negatives = -negatives if odd else np.conj(negatives)
+    return np.concatenate((negatives, xf[:(n + 1)//2]))
+
+# Espectro promediado (Welch): segmentos de nperseg muestras con solapamiento noverlap
+# (por defecto la mitad), ventaneados y normalizados por la suma de la ventana
+# Si la señal es más corta que el segmento queda un único segmento del largo de la señal
+# El módulo es el promedio en potencia de los segmentos; la fase es la del promedio coherente,
+# con cada segmento referido al inicio de la señal. Se evalúa sobre frequencies(nperseg, dt, onesided)
+# El costo es lineal en el largo y el tamaño de la salida no depende de él
+def welch(x, nperseg, noverlap=None, onesided=False, window='hann'):
+    x = np.asarray(x)
+    if noverlap is None:
+        noverlap = nperseg // 2
+    if nperseg < 1 or not 0 <= noverlap < nperseg:
+        raise ValueError(f'Parámetros de Welch inválidos: nperseg={nperseg}, noverlap={noverlap}')
+    if x.size == 0:
+        raise ValueError('Welch necesita al menos una muestra')
+    nperseg = min(nperseg, x.size)
+    noverlap = min(noverlap, nperseg - 1)
+    step = nperseg - noverlap
+    w = get_window(window, nperseg)
+    segments = np.lib.stride_tricks.sliding_window_view(x, nperseg)[::step]
+    k = np.arange(nperseg//2 + 1 if onesided else nperseg)
+    power = np.zeros(len(k))
+    coherent = np.zeros(len(k), dtype=np.complex128)
+    batch = max(1, WELCH_BATCH_SIZE // nperseg)
+    for first in range(0, len(segments), batch):
+        X = (rfft if onesided else fft)(segments[first:first + batch] * w, axis=-1)
+        starts = (first + np.arange(X.shape[0])) * step
+        power += np.sum(np.abs(X)**2, axis=0)
+        coherent += np.sum(X * np.exp(-2j*np.pi*np.outer(starts, k)/nperseg), axis=0)
+    xf = np.sqrt(power/len(segments)) * np.exp(1j*np.angle(coherent)) / np.sum(w)
+    return xf if onesided else fftshift(xf)
+
+# Espectro completo o promediado según se pida un largo de segmento
+def estimate(x, onesided=False, nperseg=None, noverlap=None):
+    if nperseg is None:
+        return spectrum(x, onesided=onesided)
+    return welch(x, nperseg, noverlap=noverlap, onesided=onesided)
+
+def magnitude(xf):
+    return np.abs(xf)
+
+# Fase desenrollada en grados
+def phase(xf):
+    return np.unwrap(np.angle(xf, deg=True), period=360)
+
+# Retardo de grupo en segundos a partir de la fase en grados: -dphi/dw
+# El último punto repite el anterior para mantener el largo de la grilla
+def group_delay(ph, f):
+    if len(f) < 2:
+        return np.zeros(len(f))
+    gd = -np.diff(ph) / (360 * np.diff(f))
+    return np.append(gd, gd[-1])
+
+# Espectro de línea de un tren de pulsos rectangulares entre 0 y 1 (período 1/fs, ciclo de
+# trabajo dc, flanco ascendente en t=0) sobre una grilla creciente f, con la misma normalización
+# que spectrum(). Los armónicos son c_k = dc*sinc(k*dc)*exp(-j*pi*k*dc), referidos al instante t0
+# de la primera muestra. Cada armónico se suma en el punto de f más cercano; fuera de medio
+# intervalo de los extremos se descarta. Si la grilla es uniforme el bin sale directo con rint;
+# si no, se busca entre los puntos medios de f: O(armónicos*log(len(f)))
+def pulse_train_spectrum(fs, dc, f, t0=0):
+    f = np.asarray(f)
+    xf = np.zeros(len(f), dtype=np.complex128)
+    if len(f) < 2:
+        return xf
+    df = f[1] - f[0]
+    if np.allclose(np.diff(f), df):
+        k = np.arange(np.ceil((f[0] - df/2) / fs), np.floor((f[-1] + df/2) / fs) + 1)
+        bins = np.rint((k*fs - f[0]) / df).astype(np.int64)
+    else:
+        edges = np.concatenate(([f[0] - df/2], (f[:-1] + f[1:])/2, [f[-1] + (f[-1] - f[-2])/2]))
+        k = np.arange(np.ceil(edges[0] / fs), np.floor(edges[-1] / fs) + 1)
+        bins = np.searchsorted(edges, k*fs, side='right') - 1
+    valid = (bins >= 0) & (bins < len(f))
+    k, bins = k[valid], bins[valid]
+    ck = dc * np.sinc(k*dc) * np.exp(-1j*np.pi*k*dc) * np.exp(2j*np.pi*k*fs*t0)
+    np.add.at(xf, bins, ck)
+    return xf
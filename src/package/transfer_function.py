@@ -1,13 +1,29 @@
 import sympy as sym
 import scipy.signal as signal
-from scipy.optimize import basinhopping
-from scipy.fft import fftfreq, fftshift, fft
+from scipy.linalg import expm
+from scipy.optimize import brentq
 import numpy as np
-from numpy.polynomial import Polynomial
+from collections import OrderedDict, defaultdict
 from .Parser import ExprParser
+from . import spectrum
 import traceback
 
 LPN, HPN, LP2, HP2, LP1, HP1, BP, BR = range(8)
+LSIM, SOS, MODAL, OACONV = range(4) # motores de simulación temporal
+ND, ZPK = range(2)
+BODE_CACHE_SIZE = 8
+MODEL_CACHE_SIZE = 4
+GRID_BASE_POINTS = 200 # puntos logarítmicos de fondo en todo el rango de la grilla adaptiva
+GRID_ROOT_POINTS = 24 # puntos a cada lado de cada polo/cero
+GRID_MAX_REFINE = 8 # pasadas máximas de refinamiento
+ROOT_RTOL, ROOT_ATOL = 1e-5, 1e-8 # tolerancias para identificar raíces (las de np.isclose)
+MODAL_RTOL = 1e-6 # polos más cercanos que esto (relativo) se toman como repetidos
+MODAL_MAX_SPREAD = 1e6 # máximo de sum |r_i/p_i|: cuánto se amplifican los redondeos al cancelarse los modos
+OACONV_RTOL = 1e-6 # cola descartada de la respuesta al impulso, relativa a la parte conservada (norma 1)
+OACONV_MIN_TAPS = 64
+OACONV_MAX_TAPS = 2**22
+OACONV_SECTIONS_PER_LOG2_TAPS = 2 # la convolución gana recién con más biquads que esto por log2(taps)
+OACONV_MIN_BLOCKS = 8 # y con señales de al menos tantas respuestas truncadas de largo
 
 # Evaluate a polynomial in reverse order using Horner's Rule,
 # for example: a3*x^3+a2*x^2+a1*x+a0 = ((a3*x+a2)x+a1)x+a0
@@ -17,10 +33,330 @@ def poly_at(p, x):
         total = total * x + a
     return total
 
+# Coeficientes del polinomio mónico con las raíces dadas, con las mismas convoluciones
+# sucesivas que signal.zpk2tf pero sin su costo fijo por llamada
+def poly_from_roots(roots):
+    roots = np.asarray(roots)
+    c = np.ones(1, dtype=roots.dtype if roots.size else np.float64)
+    for r in roots:
+        c = np.convolve(c, np.array([1, -r], dtype=c.dtype), mode='full')
+    return c
+
+# (N, D) reales a partir de ceros, polos y ganancia (raíces complejas en pares conjugados)
+def zpk_to_nd(z, p, k):
+    return np.real(k)*np.real(poly_from_roots(z)), np.real(poly_from_roots(p))
+
+# Respuesta en frecuencia a partir de ceros, polos y ganancia: cada factor (jw - r) se evalúa
+# una sola vez. Ceros y polos se alternan para no desbordar con órdenes altos
+def zpk_response(z, p, k, w):
+    s = 1j*np.asarray(w, dtype=np.float64)
+    h = np.full(s.shape, k, dtype=np.complex128)
+    for i in range(max(len(z), len(p))):
+        if i < len(z):
+            h *= s - z[i]
+        if i < len(p):
+            h /= s - p[i]
+    return h
+
+# Retardo de grupo -d(arg H)/dw como suma de los aportes de cada raíz r = a + jb:
+# a/(a^2 + (w - b)^2) por cada cero y -a/(a^2 + (w - b)^2) por cada polo
+# No pasa por los polinomios, así que es exacto también para órdenes altos
+def zpk_group_delay(z, p, w):
+    w = np.asarray(w, dtype=np.float64)
+    gd = np.zeros(w.shape)
+    for roots, sign in [(np.asarray(z, dtype=np.complex128), 1), (np.asarray(p, dtype=np.complex128), -1)]:
+        if len(roots) == 0:
+            continue
+        a = roots.real.reshape((-1,) + (1,)*w.ndim)
+        b = roots.imag.reshape((-1,) + (1,)*w.ndim)
+        gd += sign*np.sum(a / (a**2 + (w - b)**2), axis=0)
+    return gd if gd.ndim else gd[()]
+
+# Pulsaciones de [wmin, wmax] donde |H(jw)| puede tener un extremo: los bordes, los puntos de
+# una grilla agrupada alrededor de la parte imaginaria de cada raíz y los ceros de
+# log_gain_slope que cambian de signo entre puntos vecinos de esa grilla, pulidos con brentq
+# La derivada es una suma de términos racionales por raíz (no se expande ningún polinomio),
+# así que no pierde raíces ni desborda con órdenes altos o bandas lejos de las raíces
+def gain_extrema_candidates(z, p, wmin, wmax):
+    z, p = np.asarray(z, dtype=np.complex128), np.asarray(p, dtype=np.complex128)
+    w = [np.array([wmin, wmax]), np.linspace(wmin, wmax, GRID_BASE_POINTS)]
+    if wmax > 0:
+        w.append(np.geomspace(max(wmin, wmax*1e-12), wmax, GRID_BASE_POINTS))
+    offsets = np.concatenate(([0], np.geomspace(1e-3, 1e2, GRID_ROOT_POINTS)))
+    for r in np.concatenate((z, p)):
+        w.append(np.abs(r.imag) + np.abs(r.real)*np.concatenate((offsets, -offsets)))
+    w = np.unique(np.concatenate(w))
+    w = w[(w >= wmin) & (w <= wmax)]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d = log_gain_slope(z, p, w)
+    slope = lambda x: log_gain_slope(z, p, np.array([x]))[0]
+    roots = []
+    for i in np.flatnonzero(np.isfinite(d[:-1]) & np.isfinite(d[1:]) & (d[:-1]*d[1:] < 0)):
+        if slope(w[i])*slope(w[i + 1]) >= 0:
+            continue # derivada en el orden del redondeo: los puntos de la grilla ya son candidatos
+        roots.append(brentq(slope, w[i], w[i + 1], xtol=1e-15*w[i + 1], rtol=4*np.finfo(float).eps))
+    return np.unique(np.concatenate((w, roots)))
+
+# Derivada de ln|H(jw)|^2 respecto de w: suma de 2x/(x^2 + a^2) por cada cero y de lo mismo con
+# signo opuesto por cada polo a + jb, con x = w - b
+def log_gain_slope(z, p, w):
+    d = np.zeros(np.shape(w))
+    for roots, sign in [(z, 1), (p, -1)]:
+        if len(roots) == 0:
+            continue
+        a = np.real(roots)[:, np.newaxis]
+        x = np.asarray(w)[np.newaxis, :] - np.imag(roots)[:, np.newaxis]
+        d += sign*np.sum(2*x / (x**2 + a**2), axis=0)
+    return d
+
+# Mínimo y máximo exactos de |H(jw)| en [wmin, wmax]: (w del mínimo, mínimo, w del máximo, máximo)
+def gain_extrema(z, p, k, wmin, wmax):
+    w = gain_extrema_candidates(z, p, wmin, wmax)
+    g = np.abs(zpk_response(z, p, k, w))
+    return w[np.argmin(g)], np.min(g), w[np.argmax(g)], np.max(g)
+
+# Q de una raíz r: |r|/(2|Re r|). Las raíces sobre el eje jw (notches) tienen Q infinito
+def root_q(r):
+    with np.errstate(divide='ignore'):
+        return np.abs(r) / (2*np.abs(np.real(r)))
+
+# Grilla de frecuencias (Hz) entre 10^start y 10^stop pensada para el Bode: una base logarítmica
+# rala más puntos agrupados alrededor de cada polo/cero, con separación proporcional al ancho
+# de banda relativo 1/Q (los picos y notches angostos quedan resueltos con pocos puntos)
+# Con tol se subdivide en escala logarítmica cada intervalo cuyo punto medio se aparta más de tol
+# (en dB y en grados) de la interpolación entre sus extremos
+def adaptive_grid(z, p, k=1, start=-2, stop=6, tol=None):
+    fmin, fmax = 10.0**start, 10.0**stop
+    f = [np.logspace(start, stop, GRID_BASE_POINTS)]
+    offsets = np.geomspace(1e-3, 1e2, GRID_ROOT_POINTS)
+    stagger = np.sqrt(offsets[1] / offsets[0])
+    for roots, isPole in [(z, False), (p, True)]:
+        for r in np.asarray(roots, dtype=np.complex128):
+            if np.abs(r) == 0:
+                continue
+            f0 = np.abs(r) / (2*np.pi)
+            bw = max(1 / (2*root_q(r)), 1e-6)
+            f.append(f0*(1 + bw*offsets))
+            f.append(f0/(1 + bw*offsets*stagger)) # intercalados: ningún punto medio cae justo en f0
+            if isPole: # en un cero la ganancia puede ser nula
+                f.append([f0])
+    f = np.unique(np.concatenate(f))
+    f = f[(f >= fmin) & (f <= fmax)]
+    if tol is None:
+        return f
+    scale = np.array([20/np.log(10), 180/np.pi])
+    for i in range(GRID_MAX_REFINE):
+        fm = np.sqrt(f[:-1]*f[1:])
+        h = zpk_response(z, p, k, 2*np.pi*f)
+        hm = zpk_response(z, p, k, 2*np.pi*fm)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            err = np.log(hm / (h[:-1]*np.sqrt(h[1:] / h[:-1])))
+        err = np.maximum(np.abs(err.real)*scale[0], np.abs(err.imag)*scale[1])
+        refine = ~(err <= tol)
+        if not np.any(refine):
+            break
+        f = np.sort(np.concatenate((f, fm[refine])))
+    return f
+
+# Pulsaciones de la grilla de un Bode: f explícita (Hz), adaptiva, lineal o logarítmica
+def bode_grid(z, p, k, f=None, linear=False, start=-2, stop=6, num=10000, adaptive=False, tol=None):
+    if isinstance(f, np.ndarray):
+        return 2*np.pi*f
+    elif adaptive:
+        return 2*np.pi*adaptive_grid(z, p, k, start=start, stop=stop, tol=tol)
+    elif linear:
+        return np.linspace(start, stop, num) * 2 * np.pi
+    return np.logspace(start, stop, num) * 2 * np.pi
+
+# (f, ganancia, fase en grados, retardo de grupo) a partir de la respuesta en la grilla ws
+def bode_from_response(ws, h, gd, db=False):
+    g = np.abs(h)
+    ph = np.unwrap(np.angle(h)) * 180 / np.pi
+    f = ws / (2 * np.pi)
+    return f, 20*np.log10(g) if db else g, ph, gd
+
+# Discretiza una sección analógica (b, a) de hasta segundo orden con retención de primer orden,
+# que es la misma interpolación lineal de la entrada que usa lsim
+# Devuelve (fila sos digital, estado inicial, transmisión directa D): el estado inicial es el zi que
+# corresponde a partir del reposo analógico con la primera muestra de entrada en 1. Con retención de
+# primer orden el estado discreto es x - G2*u, así que el reposo analógico no es zi nulo
+def discretize_section(b, a, dt):
+    b, a = np.trim_zeros(np.asarray(b, dtype=np.float64), 'f'), np.trim_zeros(np.asarray(a, dtype=np.float64), 'f')
+    section, rest = np.zeros(6), np.zeros(2)
+    if len(a) == 1:
+        section[0], section[3] = (b[-1] / a[0] if len(b) else 0), 1
+        return section[None, :], rest[None, :], section[0]
+    # Se cambia la escala de frecuencias (s = w0*s') para que la exponencial de la matriz quede
+    # bien condicionada; la transferencia discreta no cambia si el paso pasa a ser w0*dt
+    n = len(a) - 1
+    w0 = np.max(np.abs(np.roots(a)))
+    if w0 == 0:
+        w0 = 1
+    a = a * w0**(np.arange(n, -1, -1) - n)
+    b = b * w0**(np.arange(len(b) - 1, -1, -1) - n)
+    A, B, C, D = signal.tf2ss(b, a)
+    M = np.zeros((n + 2, n + 2))
+    M[:n, :n], M[:n, n:n + 1], M[n, n + 1] = A*w0*dt, B*w0*dt, 1
+    E = expm(M)
+    Phi, G1, G2 = E[:n, :n], E[:n, n:n + 1], E[:n, n + 1:]
+    # El denominador sale de los polos discretos exp(p*dt) y el numerador de las primeras
+    # muestras de la respuesta al impulso (ss2tf pierde precisión restando polinomios casi iguales)
+    ad = np.real(np.poly(np.exp(np.roots(a)*w0*dt)))
+    Bd = G1 - G2 + Phi @ G2
+    h = [(D + C @ G2)[0, 0]] + [(C @ np.linalg.matrix_power(Phi, i) @ Bd)[0, 0] for i in range(n)]
+    bd = [np.dot(ad[:i + 1], h[i::-1]) for i in range(n + 1)]
+    section[:len(bd)] = bd
+    section[3:3 + len(ad)] = ad
+    rest[0] = -(C @ G2)[0, 0]
+    rest[1] = -(C @ (Phi + ad[1]*np.eye(n)) @ G2)[0, 0]
+    return section[None, :], rest[None, :], D[0, 0]
+
+# Encadena partes (sos, estado inicial, D): la entrada inicial de cada parte es la de la cascada
+# multiplicada por la transmisión directa de las anteriores
+def cascade_sos(parts):
+    sos, rest, d = [np.zeros((0, 6))], [np.zeros((0, 2))], 1
+    for part_sos, part_rest, part_d in parts:
+        sos.append(part_sos)
+        rest.append(part_rest*d)
+        d *= part_d
+    return np.vstack(sos), np.vstack(rest), d
+
+# Cascada de biquads digitales equivalente a la transferencia (z, p, k) para un paso dt
+# La señal entre secciones no es lineal por tramos, así que respecto de lsim queda un error O(dt^2)
+def zpk_to_digital_sos(z, p, k, dt):
+    sos = signal.zpk2sos(z, p, np.real(k), pairing='minimal', analog=True)
+    return cascade_sos([discretize_section(section[:3], section[3:], dt) for section in sos])
+
+# Filtra con una cascada de biquads. Sin zi parte del reposo analógico (como lsim)
+# Devuelve la salida y el estado final, que sirve como zi del bloque siguiente
+def sos_filter(sos, rest, xi, zi=None):
+    xi = np.asarray(xi, dtype=np.float64) # también acepta HeldSignal
+    if zi is None:
+        zi = rest*xi[0]
+    return signal.sosfilt(np.array(sos), xi, zi=zi) # sosfilt no acepta arreglos de solo lectura
+
+# Modelo modal exacto para entradas constantes entre muestras (retención de orden cero):
+# H(s) = d + sum r_i/(s - p_i) y cada modo evoluciona como x[n+1] = exp(p dt) x[n] + (exp(p dt) - 1)/p u[n]
+# Los residuos salen directamente de ceros y polos (en escala logarítmica para no desbordar con
+# órdenes altos) y de cada par conjugado se simula un solo modo con peso 2
+# Devuelve (alpha, beta, residuos, pesos, d), o None si hay polos repetidos, la transferencia es impropia
+# o los modos están tan mal condicionados (órdenes altos) que su suma pierde precisión
+def zpk_to_modal(z, p, k, dt):
+    z, p = np.asarray(z, dtype=np.complex128), np.asarray(p, dtype=np.complex128)
+    if len(z) > len(p):
+        return None
+    if len(p) > 1:
+        distance = np.abs(p[:, np.newaxis] - p[np.newaxis, :]) + np.diag(np.full(len(p), np.inf))
+        if np.any(distance <= MODAL_RTOL*np.abs(p)[:, np.newaxis]):
+            return None
+    isReal = np.abs(p.imag) <= 1e-12*np.abs(p)
+    keep = isReal | (p.imag > 0)
+    residues = []
+    for i in np.flatnonzero(keep):
+        logr = np.sum(np.log(p[i] - z)) - np.sum(np.log(np.delete(p[i] - p, i)))
+        residues.append(k*np.exp(logr))
+    modes = p[keep]
+    weights = np.where(isReal[keep], 1, 2)
+    nonzero = modes != 0
+    if np.sum(weights[nonzero]*np.abs(np.array(residues)[nonzero] / modes[nonzero])) > MODAL_MAX_SPREAD:
+        return None
+    alpha = np.exp(modes*dt)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beta = np.where(modes == 0, dt, np.expm1(modes*dt) / modes)
+    d = np.real(k) if len(z) == len(p) else 0
+    return alpha, beta, np.array(residues, dtype=np.complex128), weights, d
+
+# Simula el modelo modal partiendo del estado zi de cada modo (por defecto en reposo)
+# Devuelve la salida y el estado de los modos en la muestra siguiente, que sirve como zi del bloque siguiente
+def modal_filter(model, xi, zi=None):
+    alpha, beta, residues, weights, d = model
+    xi = np.asarray(xi, dtype=np.float64)
+    y = d*xi
+    zf = np.zeros(len(alpha), dtype=np.complex128)
+    for i in range(len(alpha)):
+        x, state = signal.lfilter([0, beta[i]], [1, -alpha[i]], xi, zi=[0 if zi is None else zi[i]])
+        y += weights[i]*np.real(residues[i]*x)
+        zf[i] = state[0]
+    return y, zf
+
+# Respuesta al impulso de la cascada de biquads truncada para filtrar por convolución
+# Por linealidad sos_filter(x) = conv(x, h) + x[0]*r, donde r es la respuesta libre desde el estado de reposo
+# El largo se duplica hasta que la cola estimada (lo que hay entre taps y 2*taps, extendido como
+# serie geométrica con la envolvente del polo más lento) sea menor que rtol veces la norma 1 de lo
+# conservado. Devuelve (h, r, cota), con cota tal que el error de truncamiento respecto de sos_filter
+# es a lo sumo cota*max|x| (sin contar redondeos), o None si el filtro es inestable o necesita más
+# de OACONV_MAX_TAPS
+def truncated_impulse_response(sos, rest, p, dt, rtol=OACONV_RTOL):
+    p = np.asarray(p, dtype=np.complex128)
+    sigma = np.max(p.real) if len(p) else -np.inf
+    if sigma >= 0:
+        return None
+    rho = np.exp(sigma*dt)
+    taps = OACONV_MIN_TAPS
+    sos = np.array(sos)
+    while 2*taps <= OACONV_MAX_TAPS:
+        impulse = np.zeros(2*taps)
+        impulse[0] = 1
+        h = signal.sosfilt(sos, impulse)
+        r = signal.sosfilt(sos, np.zeros(2*taps), zi=np.array(rest))[0]
+        tail = (np.sum(np.abs(h[taps:])) + np.sum(np.abs(r[taps:]))) / (1 - rho**taps)
+        if tail <= rtol*np.sum(np.abs(h[:taps])):
+            return h[:taps], r[:taps], tail
+        taps *= 2
+    return None
+
+# Filtra por convolución por bloques (overlap-add) con la respuesta truncada, partiendo del reposo como sos_filter
+# Devuelve la salida y la cota del error de truncamiento para esta entrada (nula si la señal no es
+# más larga que la respuesta)
+def oaconv_filter(model, xi):
+    h, r, bound = model
+    xi = np.asarray(xi, dtype=np.float64)
+    n = len(xi)
+    y = signal.oaconvolve(xi, h[:n])[:n]
+    y[:min(n, len(r))] += xi[0]*r[:n]
+    return y, (bound*np.max(np.abs(xi)) if n > len(h) else 0.0)
+
+# Si conviene filtrar por convolución en lugar de por biquads. Por muestra sosfilt cuesta del orden de
+# la cantidad de biquads y oaconvolve del orden de log2(taps) con una constante mayor: medido con
+# Butterworth de 12 a 32 biquads y señales de 10^4 a 10^6 muestras, la convolución es más rápida
+# cuando hay más de ~2*log2(taps) biquads y la señal abarca varias respuestas truncadas; con los
+# órdenes habituales (hasta unos 10 biquads) SOS es entre 2 y 6 veces más rápido
+def oaconv_pays(sections, taps, n):
+    return sections > OACONV_SECTIONS_PER_LOG2_TAPS*np.log2(taps) and n >= OACONV_MIN_BLOCKS*taps
+
+# Discretización de lsim (interpolación lineal de la entrada) para un paso dt, separada de la
+# simulación para poder reutilizarla: (Ad, Bd0, Bd1, C, D) con el estado como vector fila
+def lsim_model(tf_object, dt):
+    ss = tf_object.to_ss()
+    A, B, C, D = map(np.asarray, (ss.A, ss.B, ss.C, ss.D))
+    n = A.shape[0]
+    M = np.vstack([np.hstack([A * dt, B * dt, np.zeros((n, 1))]),
+                   np.hstack([np.zeros((1, n + 1)), np.identity(1)]),
+                   np.zeros((1, n + 2))])
+    expMT = expm(M.T)
+    Ad = expMT[:n, :n]
+    Bd1 = expMT[n + 1:, :n]
+    Bd0 = expMT[n:n + 1, :n] - Bd1
+    return Ad, Bd0, Bd1, C, D
+
+# Misma recurrencia que lsim partiendo del reposo, con un modelo ya discretizado
+def lsim_filter(model, xi):
+    Ad, Bd0, Bd1, C, D = model
+    U = np.asarray(xi, dtype=np.float64)[:, np.newaxis]
+    xout = np.zeros((len(U), Ad.shape[0]))
+    for i in range(1, len(U)):
+        xout[i] = xout[i-1] @ Ad + U[i-1] @ Bd0 + U[i] @ Bd1
+    return np.squeeze(xout @ C.T) + np.squeeze(U @ D.T)
+
 class TFunction():
+    # Layout compacto: se crean muchas instancias descartables (búsqueda de orden, etapas)
+    __slots__ = ('_tf_object', '_ltiForm', '_eparser', 'p', 'z', 'k', 'gain', 'N', 'D',
+                 '_fingerprint', '_bodeCache', '_bodeLast', '_modelCache')
+
     def __init__(self, *args, normalize=False):
-        self.tf_object = {}
-        self.eparser = ExprParser()
+        self._tf_object = None
+        self._ltiForm = None # forma del objeto LTI de scipy: ND o ZPK, según cómo se cargó
+        self._eparser = None
 
         self.p = []
         self.z = []
@@ -28,8 +364,10 @@ class TFunction():
         self.gain = 1 #ganancia verdadera
         self.N = []
         self.D = []
-        self.dN = []
-        self.dD = []
+        self._fingerprint = None
+        self._bodeCache = None
+        self._bodeLast = None
+        self._modelCache = None
 
         if(len(args) == 1):
             self.setExpression(args[0], normalize=normalize)
@@ -40,6 +378,24 @@ class TFunction():
         if(len(args) == 5):
             self.setZPKND(args[0], args[1], args[2], args[3], args[4])
 
+    # El parser (sympy) y el objeto LTI de scipy se arman recién cuando se usan
+    @property
+    def eparser(self):
+        if self._eparser is None:
+            self._eparser = ExprParser()
+        return self._eparser
+
+    @property
+    def tf_object(self):
+        if self._tf_object is None:
+            if self._ltiForm == ND:
+                self._tf_object = signal.TransferFunction(self.N, self.D)
+            elif self._ltiForm == ZPK:
+                self._tf_object = signal.ZerosPolesGain(self.z, self.p, self.k)
+            else:
+                return {}
+        return self._tf_object
+
     def setExpression(self, txt, normalize=False):
         try:
             self.eparser.setTxt(txt)
@@ -58,25 +414,35 @@ class TFunction():
         self.z, self.p, self.k = signal.tf2zpk(self.N, self.D)        
         if normalize:
             self.normalize()
-        self.tf_object = signal.TransferFunction(self.N, self.D)
-        self.computedDerivatives = False
+        self._ltiForm = ND
+        self._invalidate()
     
     def getND(self):
         return self.N, self.D
 
+    # Cualquier cambio de coeficientes descarta lo que se calculó a partir de ellos
+    # (los caches se crean con el primer resultado)
+    def _invalidate(self):
+        self._fingerprint = None
+        self._tf_object = None
+        self._bodeCache = None
+        self._bodeLast = None
+        self._modelCache = None
+
+    # Huella de (z, p, k, N, D) para identificar resultados cacheados
+    def fingerprint(self):
+        if self._fingerprint is None:
+            self._fingerprint = hash(tuple(np.asarray(a).tobytes() for a in [self.z, self.p, self.k, self.N, self.D]))
+        return self._fingerprint
+
     #Nota: signal NO normaliza la transferencia, por lo que k multiplica pero no es la ganancia en s=0
     def setZPK(self, z, p, k, normalize=False):
         self.z, self.p, self.k = np.array(z, dtype=np.complex128), np.array(p, dtype=np.complex128), k
-        N, D = signal.zpk2tf(self.z, self.p, self.k)
-        if not hasattr(N, '__iter__'):
-            N = [N]
-        if not hasattr(D, '__iter__'):
-            D = [D]
-        self.N, self.D = np.array(N, dtype=np.float64), np.array(D, dtype=np.float64)
+        self.N, self.D = zpk_to_nd(self.z, self.p, self.k)
         if normalize:
             self.normalize()
-        self.computedDerivatives = False
-        self.tf_object = signal.ZerosPolesGain(self.z, self.p, self.k)
+        self._ltiForm = ZPK
+        self._invalidate()
 
     
     def setZPKND(self, z, p, k, N, D):
@@ -86,8 +452,8 @@ class TFunction():
             D = [D]
         self.N, self.D = np.array(N, dtype=np.float64), np.array(D, dtype=np.float64)
         self.z, self.p, self.k = z, p, k      
-        self.tf_object = signal.ZerosPolesGain(self.z, self.p, self.k)
-        self.computedDerivatives = False
+        self._ltiForm = ZPK
+        self._invalidate()
 
     def getZPK(self, in_hz=False):
         if(in_hz):
@@ -95,13 +461,6 @@ class TFunction():
         else:
             return self.z, self.p, self.k
 
-    def getDerivatives(self):
-        N = Polynomial(np.flip(self.N))
-        D = Polynomial(np.flip(self.D))
-        self.dN = np.flip(N.deriv().coef)
-        self.dD = np.flip(D.deriv().coef)
-        self.computedDerivatives = True
-
     def normalize(self):
         self.gain = self.k
         a = 1+0j #lo voy a usar para normalizar, los zpk que da numpy no vienen normalizados
@@ -115,7 +474,7 @@ class TFunction():
             a = -a/pole
         self.k = self.k/a
         self.N = self.N/a
-        self.computedDerivatives = False
+        self._invalidate()
     
     def denormalize(self):
         a = 1+0j
@@ -125,7 +484,7 @@ class TFunction():
             a /= -pole
         self.k = self.k*a
         self.N = self.N*a
-        self.computedDerivatives = False
+        self._invalidate()
 
     def at(self, s):
         return poly_at(self.N, s) / poly_at(self.D, s)
@@ -136,11 +495,8 @@ class TFunction():
     def maxFunctionMod(self, w):
         return -abs(self.at(1j*w))
     
-    #como ln(H) = ln(G) + j phi --> H'/H = G'/G + j phi'
     def gd_at(self, w0):
-        if not self.computedDerivatives:
-            self.getDerivatives()
-        return -np.imag(1j*(poly_at(self.dN, 1j*w0)/poly_at(self.N, 1j*w0) - poly_at(self.dD, 1j*w0)/poly_at(self.D, 1j*w0))) #'1j*..' --> regla de la cadena
+        return zpk_group_delay(self.z, self.p, w0)
         
     def getZP(self, in_hz=False):
         if(in_hz):
@@ -148,40 +504,63 @@ class TFunction():
         else:
             return self.z, self.p
 
-    def getBode(self, f=None, linear=False, start=-2, stop=6, num=10000, db=False):
-        if isinstance(f, np.ndarray):
-            ws = 2*np.pi*f
-        elif linear:
-            ws = np.linspace(start, stop, num) * 2 * np.pi
+    # Los resultados se memorizan por huella de coeficientes y parámetros de la grilla
+    # (los arreglos devueltos son de solo lectura)
+    # Con adaptive la grilla sale de adaptive_grid (num no se usa)
+    # Una grilla explícita puede ser tan larga como la captura (la del FFT), así que de esas se
+    # guarda solo la última, identificada por el arreglo mismo y su forma: si se modifica f en su
+    # lugar hay que pasar una copia
+    def getBode(self, f=None, linear=False, start=-2, stop=6, num=10000, db=False, adaptive=False, tol=None):
+        if f is not None:
+            f = np.asarray(f)
+            last = self._bodeLast
+            if last is not None and last[0] is f and last[1] == f.shape and last[2] == db:
+                return last[3]
+            result = self.computeBode(f=f, db=db)
+            for a in result:
+                a.setflags(write=False)
+            self._bodeLast = (f, f.shape, db, result)
+            return result
+        if adaptive:
+            grid = ('adaptive', start, stop, tol)
         else:
-            ws = np.logspace(start, stop, num) * 2 * np.pi
-        #h = self.at(1j*ws)
-        w, g, ph = signal.bode(self.tf_object, w=ws)
-        gd = self.gd_at(ws) #/ (2 * np.pi) #--> no hay que hacer regla de cadena porque se achica tmb la escala de w
-        f = ws / (2 * np.pi)
-        return f, g if db else 10**(g/20), ph, gd
-
-    #No funciona (y no lo necesitamos) actualmente
-    def optimize(self, start, stop, maximize = False):
-        # rewrite the bounds in the way required by L-BFGS-B
-        bounds = [(start, stop)]
-        w0 = 0.5*(start + stop)
+            grid = (linear, start, stop, num)
+        key = (self.fingerprint(), grid, db)
+        if self._bodeCache is None:
+            self._bodeCache = OrderedDict()
+        if key in self._bodeCache:
+            self._bodeCache.move_to_end(key)
+            return self._bodeCache[key]
+        result = self.computeBode(f=f, linear=linear, start=start, stop=stop, num=num, db=db, adaptive=adaptive, tol=tol)
+        for a in result:
+            a.setflags(write=False)
+        self._bodeCache[key] = result
+        while len(self._bodeCache) > BODE_CACHE_SIZE:
+            self._bodeCache.popitem(last=False)
+        return result
 
-        if not maximize:
-            f = lambda w : self.minFunctionMod(w)
-        else:
-            f = lambda w : self.maxFunctionMod(w)
+    def computeBode(self, f=None, linear=False, start=-2, stop=6, num=10000, db=False, adaptive=False, tol=None):
+        ws = bode_grid(self.z, self.p, self.k, f=f, linear=linear, start=start, stop=stop, num=num, adaptive=adaptive, tol=tol)
+        h = zpk_response(self.z, self.p, self.k, ws)
+        gd = zpk_group_delay(self.z, self.p, ws) #/ (2 * np.pi) #--> no hay que hacer regla de cadena porque se achica tmb la escala de w
+        return bode_from_response(ws, h, gd, db)
 
-        # use method L-BFGS-B because the problem is smooth and bounded
-        minimizer_kwargs = dict(method="L-BFGS-B", bounds=bounds)
-        res = basinhopping(f, w0, minimizer_kwargs=minimizer_kwargs)
-        return res.x, (res.fun if not maximize else -res.fun)
+    # Mínimo (o máximo) de |H(jw)| con w entre start y stop: devuelve (w, |H(jw)|)
+    def optimize(self, start, stop, maximize = False):
+        wmin, gmin, wmax, gmax = gain_extrema(self.z, self.p, self.k, start, stop)
+        return (wmax, gmax) if maximize else (wmin, gmin)
 
     def appendStage(self, tf):
         self.setZPK(np.append(self.z, tf.z), np.append(self.p, tf.p), self.k*tf.k)
 
+    # Quita una vez cada raíz de la etapa (con tolerancia)
     def removeStage(self, tf):
-        self.setZPK([i for i in self.z if i not in tf.z], [i for i in self.p if i not in tf.p], self.k/tf.k)
+        zeros, poles = RootIndex(self.z), RootIndex(self.p)
+        for z in tf.z:
+            zeros.remove(z)
+        for p in tf.p:
+            poles.remove(p)
+        self.setZPK(zeros.tolist(), poles.tolist(), self.k/tf.k)
         
     def getLatex(self, txt):
         return self.eparser.getLatex(txt=txt)
@@ -236,14 +615,13 @@ class TFunction():
             return "Cable"
         return "Invalid"
 
+    # Ganancias mínima y máxima en la banda bpw (Hz); con isReject son dos bandas
     def getEdgeGainsInRange(self, isReject, bpw, db=True):
-        if isReject:
-            f1, g1, ph1, gd1 = self.getBode(linear=True, start=bpw[0][0], stop=bpw[0][1], num=1000, db=db)
-            f2, g2, ph2, gd2 = self.getBode(linear=True, start=bpw[1][0], stop=bpw[1][1], num=1000, db=db)
-            minGain, maxGain = min(g1 + g2), max(g1 + g2)
-        else:
-            f, g, ph, gd = self.getBode(linear=True, start=bpw[0], stop=bpw[1], num=1000, db=db)
-            minGain, maxGain = min(g), max(g)
+        bands = bpw if isReject else [bpw]
+        extrema = [gain_extrema(self.z, self.p, self.k, 2*np.pi*band[0], 2*np.pi*band[1]) for band in bands]
+        minGain, maxGain = min(e[1] for e in extrema), max(e[3] for e in extrema)
+        if db:
+            return 20*np.log10(minGain), 20*np.log10(maxGain)
         return minGain, maxGain
 
     def getPoleQ(self):
@@ -251,9 +629,180 @@ class TFunction():
             return np.abs(self.p[0])/(- 2 * self.p[0].real)
         return 0
     
-    def simulateInputSignal(self, xi, time):
-        return signal.lsim(self.tf_object, U=xi, T=time)[1]
-    
-    def getFFT(self, xi):
-        xf = fftshift(fft(xi))/xi.size
-        return xf
\ No newline at end of file
+    # La grilla temporal tiene que ser uniforme; el modelo discretizado se reutiliza mientras
+    # no cambien los coeficientes ni el paso
+    def simulateInputSignal(self, xi, time, engine=LSIM):
+        if engine == SOS:
+            return self.simulateSOS(xi, time[1] - time[0])[0]
+        if engine == MODAL:
+            return self.simulateModal(xi, time[1] - time[0])[0]
+        if engine == OACONV:
+            return self.simulateOAConv(xi, time[1] - time[0])[0]
+        return lsim_filter(self.getDiscreteModel(LSIM, time[1] - time[0]), xi)
+
+    # Modelo discretizado para el motor y el paso dados, memorizado por huella de coeficientes y dt
+    # (los arreglos devueltos son de solo lectura)
+    def getDiscreteModel(self, engine, dt):
+        key = (self.fingerprint(), engine, dt)
+        if self._modelCache is None:
+            self._modelCache = OrderedDict()
+        if key in self._modelCache:
+            self._modelCache.move_to_end(key)
+            return self._modelCache[key]
+        if engine == SOS:
+            model = zpk_to_digital_sos(self.z, self.p, self.k, dt)
+        elif engine == MODAL:
+            model = zpk_to_modal(self.z, self.p, self.k, dt) # None también se memoriza
+        elif engine == OACONV:
+            model = truncated_impulse_response(*self.getSOS(dt)[:2], self.p, dt)
+        else:
+            model = lsim_model(self.tf_object, dt)
+        for a in model or []:
+            if isinstance(a, np.ndarray):
+                a.setflags(write=False)
+        self._modelCache[key] = model
+        while len(self._modelCache) > MODEL_CACHE_SIZE:
+            self._modelCache.popitem(last=False)
+        return model
+
+    # Biquads digitales para un paso dt: (sos, estado de reposo, transmisión directa)
+    def getSOS(self, dt):
+        return self.getDiscreteModel(SOS, dt)
+
+    # Simulación por biquads; devuelve también el estado para continuar con el bloque siguiente
+    def simulateSOS(self, xi, dt, zi=None):
+        sos, rest, d = self.getSOS(dt)
+        return sos_filter(sos, rest, xi, zi)
+
+    # Simulación modal, exacta solo para entradas realmente escalonadas (constantes entre muestras, como
+    # un HeldSignal denso; el S&H de Sampler sigue a la entrada durante dc y no lo es); devuelve también
+    # el estado. Cuando zpk_to_modal no da un modelo (polos repetidos, órdenes altos mal condicionados)
+    # se usa SOS, y el estado devuelto es entonces el de SOS
+    def simulateModal(self, xi, dt, zi=None):
+        model = self.getDiscreteModel(MODAL, dt)
+        if model is None:
+            return self.simulateSOS(xi, dt, zi)
+        return modal_filter(model, xi, zi)
+
+    # Simulación por convolución con la respuesta al impulso truncada: aproxima a SOS (no a lsim, que
+    # discretiza distinto) y solo la reemplaza donde es más rápida, en filtros de muchos biquads con
+    # respuesta corta frente a la señal (ver oaconv_pays). Devuelve la salida y la cota del error de
+    # truncamiento respecto de SOS; si el filtro no admite truncamiento (inestable o con cola demasiado
+    # larga) o la convolución no conviene, usa SOS y la cota es nula
+    def simulateOAConv(self, xi, dt):
+        model = self.getDiscreteModel(OACONV, dt)
+        if model is None or not oaconv_pays(len(self.getSOS(dt)[0]), len(model[0]), len(xi)):
+            return self.simulateSOS(xi, dt)[0], 0.0
+        return oaconv_filter(model, xi)
+
+    def getFFT(self, xi, onesided=False, nperseg=None, noverlap=None):
+        return spectrum.estimate(xi, onesided=onesided, nperseg=nperseg, noverlap=noverlap)
+
+
+# Multiconjunto de raíces con búsqueda por tolerancia (la de np.isclose: |a - r| <= atol + rtol*|r|)
+# en O(1): cada raíz se ubica en una celda más ancha que la tolerancia, así que una raíz cercana
+# está en la misma celda o en una vecina. Donde domina la tolerancia relativa las celdas son de
+# (log|r|, arg r); cerca del origen, donde domina atol, son cuadradas en el plano complejo
+# (las raíces cerca del límite entre las dos zonas se buscan en ambas)
+class RootIndex():
+    def __init__(self, roots=[]):
+        self._cells = defaultdict(list)
+        self._size = 0
+        self._small = ROOT_ATOL / ROOT_RTOL
+        self._w = 2*(ROOT_ATOL + ROOT_RTOL*self._small)
+        self._h = 4*ROOT_RTOL
+        self._turns = int(np.ceil(2*np.pi / self._h))
+        for r in roots:
+            self.add(r)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for cell in self._cells.values():
+            yield from cell
+
+    def tolist(self):
+        return list(self)
+
+    def _smallCell(self, r):
+        return 's', int(np.floor(np.real(r) / self._w)), int(np.floor(np.imag(r) / self._w))
+
+    def _polarCell(self, r):
+        return int(np.floor(np.log(np.abs(r)) / self._h)), int(np.floor(np.angle(r) % (2*np.pi) / self._h))
+
+    def _cell(self, r):
+        return self._smallCell(r) if np.abs(r) <= self._small else self._polarCell(r)
+
+    def _neighbours(self, r):
+        if np.abs(r) <= self._small*(1 + self._h):
+            _, i, j = self._smallCell(r)
+            for di in (-1, 0, 1):
+                for dj in (-1, 0, 1):
+                    yield 's', i + di, j + dj
+        if np.abs(r) >= self._small*(1 - self._h):
+            m, a = self._polarCell(r)
+            for dm in (-1, 0, 1):
+                for da in (-1, 0, 1):
+                    yield m + dm, (a + da) % self._turns
+
+    def add(self, r):
+        self._cells[self._cell(r)].append(r)
+        self._size += 1
+
+    # Raíz guardada que coincide con r, o None
+    def find(self, r):
+        for key in self._neighbours(r):
+            for candidate in self._cells.get(key, []):
+                if np.isclose(candidate, r, rtol=ROOT_RTOL, atol=ROOT_ATOL):
+                    return candidate
+        return None
+
+    # Quita una raíz que coincide con r y la devuelve (None si no hay)
+    def remove(self, r):
+        for key in self._neighbours(r):
+            cell = self._cells.get(key, [])
+            for i, candidate in enumerate(cell):
+                if np.isclose(candidate, r, rtol=ROOT_RTOL, atol=ROOT_ATOL):
+                    self._size -= 1
+                    return cell.pop(i)
+        return None
+
+# Cascada de etapas (TFunction) en orden. Agregar o quitar una etapa no vuelve a expandir
+# el polinomio completo: la transferencia total se arma solo si se pide
+class Cascade():
+    def __init__(self):
+        self.stages = []
+        self._tf = None
+
+    def __len__(self):
+        return len(self.stages)
+
+    def append(self, tf):
+        self.stages.append(tf)
+        self._tf = None
+
+    # Quita la etapa (el mismo objeto que se agregó)
+    def remove(self, tf):
+        i = next(i for i, stage in enumerate(self.stages) if stage is tf)
+        self.stages.pop(i)
+        self._tf = None
+
+    @property
+    def z(self):
+        return np.concatenate([np.zeros(0, dtype=np.complex128)] + [np.asarray(s.z, dtype=np.complex128) for s in self.stages])
+
+    @property
+    def p(self):
+        return np.concatenate([np.zeros(0, dtype=np.complex128)] + [np.asarray(s.p, dtype=np.complex128) for s in self.stages])
+
+    @property
+    def k(self):
+        return np.prod([s.k for s in self.stages]) if self.stages else 1
+
+    # Transferencia total, armada a demanda
+    @property
+    def tf(self):
+        if self._tf is None:
+            self._tf = TFunction(self.z, self.p, self.k)
+        return self._tf
@@ -14,13 +14,13 @@ from PyQt5 import QtCore, QtGui, QtWidgets
 class Ui_InputDialog(object):
     def setupUi(self, InputDialog):
         InputDialog.setObjectName("InputDialog")
-        InputDialog.resize(709, 334)
+        InputDialog.resize(709, 424)
         self.error_label = QtWidgets.QLabel(InputDialog)
-        self.error_label.setGeometry(QtCore.QRect(10, 289, 611, 31))
+        self.error_label.setGeometry(QtCore.QRect(10, 379, 611, 31))
         self.error_label.setText("")
         self.error_label.setObjectName("error_label")
         self.horizontalLayoutWidget = QtWidgets.QWidget(InputDialog)
-        self.horizontalLayoutWidget.setGeometry(QtCore.QRect(0, 0, 711, 281))
+        self.horizontalLayoutWidget.setGeometry(QtCore.QRect(0, 0, 711, 371))
         self.horizontalLayoutWidget.setObjectName("horizontalLayoutWidget")
         self.horizontalLayout = QtWidgets.QHBoxLayout(self.horizontalLayoutWidget)
         self.horizontalLayout.setContentsMargins(0, 0, 0, 0)
@@ -86,6 +86,25 @@ class Ui_InputDialog(object):
         self.dla_box.setProperty("value", 10.0)
         self.dla_box.setObjectName("dla_box")
         self.formLayout_4.setWidget(5, QtWidgets.QFormLayout.FieldRole, self.dla_box)
+        self.label_64 = QtWidgets.QLabel(self.horizontalLayoutWidget)
+        self.label_64.setObjectName("label_64")
+        self.formLayout_4.setWidget(6, QtWidgets.QFormLayout.LabelRole, self.label_64)
+        self.os_box = QtWidgets.QSpinBox(self.horizontalLayoutWidget)
+        self.os_box.setMinimum(2)
+        self.os_box.setMaximum(1000)
+        self.os_box.setProperty("value", 100)
+        self.os_box.setObjectName("os_box")
+        self.formLayout_4.setWidget(6, QtWidgets.QFormLayout.FieldRole, self.os_box)
+        self.fastlen_chk = QtWidgets.QCheckBox(self.horizontalLayoutWidget)
+        self.fastlen_chk.setObjectName("fastlen_chk")
+        self.formLayout_4.setWidget(7, QtWidgets.QFormLayout.FieldRole, self.fastlen_chk)
+        self.label_65 = QtWidgets.QLabel(self.horizontalLayoutWidget)
+        self.label_65.setObjectName("label_65")
+        self.formLayout_4.setWidget(8, QtWidgets.QFormLayout.LabelRole, self.label_65)
+        self.points_label = QtWidgets.QLabel(self.horizontalLayoutWidget)
+        self.points_label.setText("")
+        self.points_label.setObjectName("points_label")
+        self.formLayout_4.setWidget(8, QtWidgets.QFormLayout.FieldRole, self.points_label)
         self.horizontalLayout.addLayout(self.formLayout_4)
         self.textBrowser = QtWidgets.QTextBrowser(self.horizontalLayoutWidget)
         self.textBrowser.setEnabled(True)
@@ -93,7 +112,7 @@ class Ui_InputDialog(object):
         self.horizontalLayout.addWidget(self.textBrowser)
         self.check_btn = QtWidgets.QPushButton(InputDialog)
         self.check_btn.setEnabled(True)
-        self.check_btn.setGeometry(QtCore.QRect(630, 290, 71, 34))
+        self.check_btn.setGeometry(QtCore.QRect(630, 380, 71, 34))
         self.check_btn.setObjectName("check_btn")
 
         self.retranslateUi(InputDialog)
@@ -115,6 +134,10 @@ class Ui_InputDialog(object):
         self.dsh_box.setSuffix(_translate("InputDialog", "%"))
         self.label_63.setText(_translate("InputDialog", "Duty (Llave)"))
         self.dla_box.setSuffix(_translate("InputDialog", "%"))
+        self.label_64.setText(_translate("InputDialog", "Sobremuestreo"))
+        self.os_box.setSuffix(_translate("InputDialog", " x fs"))
+        self.fastlen_chk.setText(_translate("InputDialog", "Largo rápido para FFT"))
+        self.label_65.setText(_translate("InputDialog", "Puntos"))
         self.textBrowser.setHtml(_translate("InputDialog", "<!DOCTYPE HTML PUBLIC \"-//W3C//DTD HTML 4.0//EN\" \"http://www.w3.org/TR/REC-html40/strict.dtd\">\n"
 "<html><head><meta name=\"qrichtext\" content=\"1\" /><style type=\"text/css\">\n"
 "p, li { white-space: pre-wrap; }\n"
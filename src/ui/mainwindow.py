@@ -211,7 +211,7 @@ class Ui_MainWindow(object):
         self.tab_2 = QtWidgets.QWidget()
         self.tab_2.setObjectName("tab_2")
         self.groupBox_2 = QtWidgets.QGroupBox(self.tab_2)
-        self.groupBox_2.setGeometry(QtCore.QRect(0, 0, 211, 341))
+        self.groupBox_2.setGeometry(QtCore.QRect(0, 0, 211, 441))
         self.groupBox_2.setMaximumSize(QtCore.QSize(16777215, 16777215))
         self.groupBox_2.setObjectName("groupBox_2")
         self.gridLayout_7 = QtWidgets.QGridLayout(self.groupBox_2)
@@ -303,6 +303,22 @@ class Ui_MainWindow(object):
         self.plt_grid.setChecked(True)
         self.plt_grid.setObjectName("plt_grid")
         self.gridLayout_7.addWidget(self.plt_grid, 5, 0, 1, 2)
+        self.spec_onesided = QtWidgets.QCheckBox(self.groupBox_2)
+        self.spec_onesided.setObjectName("spec_onesided")
+        self.gridLayout_7.addWidget(self.spec_onesided, 9, 0, 1, 2)
+        self.spec_welch = QtWidgets.QCheckBox(self.groupBox_2)
+        self.spec_welch.setObjectName("spec_welch")
+        self.gridLayout_7.addWidget(self.spec_welch, 10, 0, 1, 1)
+        self.spec_welch_sb = QtWidgets.QSpinBox(self.groupBox_2)
+        self.spec_welch_sb.setMinimum(16)
+        self.spec_welch_sb.setMaximum(16777216)
+        self.spec_welch_sb.setSingleStep(1024)
+        self.spec_welch_sb.setProperty("value", 4096)
+        self.spec_welch_sb.setObjectName("spec_welch_sb")
+        self.gridLayout_7.addWidget(self.spec_welch_sb, 10, 1, 1, 1)
+        self.smp_exact = QtWidgets.QCheckBox(self.groupBox_2)
+        self.smp_exact.setObjectName("smp_exact")
+        self.gridLayout_7.addWidget(self.smp_exact, 11, 0, 1, 2)
         self.label_18 = QtWidgets.QLabel(self.groupBox_2)
         self.label_18.setObjectName("label_18")
         self.gridLayout_7.addWidget(self.label_18, 3, 0, 1, 1)
@@ -821,6 +837,10 @@ class Ui_MainWindow(object):
         self.label_25.setText(_translate("MainWindow", "Title font size"))
         self.label_19.setText(_translate("MainWindow", "Leg. position"))
         self.plt_grid.setText(_translate("MainWindow", "Grid lines"))
+        self.spec_onesided.setText(_translate("MainWindow", "One-sided spectra"))
+        self.spec_welch.setText(_translate("MainWindow", "Welch segment"))
+        self.spec_welch_sb.setSuffix(_translate("MainWindow", " smp"))
+        self.smp_exact.setText(_translate("MainWindow", "Exact sampling instants"))
         self.label_18.setText(_translate("MainWindow", "Leg. font size"))
         self.tabWidget.setTabText(self.tabWidget.indexOf(self.tab_2), _translate("MainWindow", "Tab 2"))
         self.groupBox_3.setTitle(_translate("MainWindow", "Filter parameters"))
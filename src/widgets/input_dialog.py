@@ -7,6 +7,7 @@ from src.ui.inputwindow import Ui_InputDialog
 
 import numpy as np
 import scipy.signal as signal
+from scipy.fft import next_fast_len
 
 sin = np.sin
 cos = np.cos
@@ -21,6 +22,32 @@ pi = np.pi
 e = np.e
 gamma = np.euler_gamma
 
+# Cantidad aproximada de arreglos de largo completo (en float64) que mantiene vivos el pipeline:
+# entrada, salida de cada bloque, señales de muestreo y espectros complejos
+PIPELINE_ARRAYS = 16
+
+# Grilla temporal con paso 1/(oversampling*fs). Con fast_len se alarga hasta el próximo largo
+# 5-suave (factores 2, 3 y 5) para que todas las FFT del pipeline sean rápidas; el paso no se toca
+# (los muestreadores cuentan con oversampling puntos por período), así que la grilla termina
+# después de tmax (ver grid_end)
+def build_time_grid(tmin, tmax, fs, oversampling=100, fast_len=False):
+    dt = 1/(oversampling*fs)
+    if not fast_len:
+        return np.arange(tmin, tmax, dt)
+    return tmin + np.arange(grid_length(tmin, tmax, fs, oversampling, fast_len))*dt
+
+# Largo de la grilla sin construirla
+def grid_length(tmin, tmax, fs, oversampling=100, fast_len=False):
+    n = max(int(np.ceil((tmax - tmin)/(1/(oversampling*fs)))), 1)
+    return next_fast_len(n, real=True) if fast_len else n
+
+# Instante del último punto de una grilla de n puntos
+def grid_end(tmin, n, fs, oversampling=100):
+    return tmin + (n - 1)/(oversampling*fs)
+
+def estimate_memory(n):
+    return n * 8 * PIPELINE_ARRAYS
+
 class InputDialog(QtWidgets.QDialog, Ui_InputDialog):
     def __init__(self, parent=None):
         super().__init__()
@@ -32,7 +59,13 @@ class InputDialog(QtWidgets.QDialog, Ui_InputDialog):
         self.fs = self.fs_box.value()
         self.dsh = self.dsh_box.value()/100
         self.dla = self.dla_box.value()/100
+        self.oversampling = self.os_box.value()
+        self.fastLen = self.fastlen_chk.isChecked()
         self.time = []
+        for box in [self.minbox, self.maxbox, self.fs_box, self.os_box]:
+            box.valueChanged.connect(self.updateGridInfo)
+        self.fastlen_chk.stateChanged.connect(self.updateGridInfo)
+        self.updateGridInfo()
 
     def getInputTitle(self):
         return self.resp_name_txt.text()
@@ -44,14 +77,26 @@ class InputDialog(QtWidgets.QDialog, Ui_InputDialog):
         if txt != '':
             self.input_txt.setEnabled(True)
     
+    # Muestra cuántos puntos va a tener la grilla, hasta qué instante llega y cuánta memoria usaría el pipeline
+    def updateGridInfo(self, *args):
+        tmin, tmax, fs = self.minbox.value(), self.maxbox.value(), self.fs_box.value()
+        if tmin < 0 or tmin >= tmax or fs <= 0:
+            self.points_label.clear()
+            return
+        n = grid_length(tmin, tmax, fs, self.os_box.value(), self.fastlen_chk.isChecked())
+        end = grid_end(tmin, n, fs, self.os_box.value())
+        self.points_label.setText("{} hasta t={:.6g} s (~{:.1f} MB)".format(n, end, estimate_memory(n)/2**20))
+
     def validateInput(self):
         try:
             self.fs = self.fs_box.value()
             self.dsh = self.dsh_box.value()/100
             self.dla = self.dla_box.value()/100
+            self.oversampling = self.os_box.value()
+            self.fastLen = self.fastlen_chk.isChecked()
             if (self.minbox.value() < 0 or self.maxbox.value() < 0 or self.minbox.value() >= self.maxbox.value()):
                 return False
-            self.time = np.arange(self.minbox.value(), self.maxbox.value(), 1/(100*self.fs))
+            self.time = build_time_grid(self.minbox.value(), self.maxbox.value(), self.fs, self.oversampling, self.fastLen)
             t = self.time #necesario para el eval()
             self.input_func = eval(self.input_txt.text())
         except Exception: